@@ -0,0 +1,10 @@
+from django.core.cache import cache
+
+
+def get_redis_client():
+    """
+    Get the Redis client of the default cache for the data structures not supported by the cache API.
+    Returns:
+        redis.Redis: The Redis client sharing the connection pool of the cache.
+    """
+    return cache._cache.get_client(write=True)
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+def get_company_roles_redis_key(user_id):
+    return f'company_roles_{user_id}'
+
+
+def get_cached_company_roles(user_id):
+    """
+    Get the roles of a user in their companies from Redis or load them from the database.
+    Args:
+        user_id (int): The ID of the user.
+    Returns:
+        dict: Dictionary {company ID: role}.
+    """
+    from common.roles import load_company_roles
+
+    redis_key = get_company_roles_redis_key(user_id)
+
+    roles = cache.get(redis_key)
+    if roles is None:
+        roles = load_company_roles(user_id)
+        cache.set(redis_key, roles, settings.REDIS_DATA_EXPIRATION)
+
+    return roles
+
+
+def invalidate_company_roles(user_ids):
+    """
+    Delete the cached roles of the users. The roles are deleted at once and again after the transaction commits,
+    so a request reading the old rows before the commit cannot keep the old roles in the cache.
+    Args:
+        user_ids (Iterable): IDs of the users whose roles changed.
+    Returns:
+        None
+    """
+    redis_keys = [get_company_roles_redis_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if not redis_keys:
+        return
+
+    cache.delete_many(redis_keys)
+    transaction.on_commit(lambda: cache.delete_many(redis_keys))
@@ -0,0 +1,153 @@
+from collections import defaultdict
+
+from common.cache.client import get_redis_client
+from common.enums import QuizProgressStatus
+
+GLOBAL_LEADERBOARD_KEY = 'leaderboard_global'
+COMPANY_LEADERBOARD_KEY_PREFIX = 'leaderboard_company_'
+
+
+def get_company_leaderboard_key(company_id):
+    return f'{COMPANY_LEADERBOARD_KEY_PREFIX}{company_id}'
+
+
+def update_leaderboards(user_quiz_result):
+    """
+    Update the global and the company leaderboard with the ratings of a completed quiz result.
+    Args:
+        user_quiz_result (UserQuizResult): The completed quiz result.
+    Returns:
+        None
+    """
+    if user_quiz_result.participant_id is None:
+        return
+
+    pipeline = get_redis_client().pipeline(transaction=True)
+    pipeline.zadd(GLOBAL_LEADERBOARD_KEY, {user_quiz_result.participant_id: float(user_quiz_result.user_rating)})
+    if user_quiz_result.company_id is not None:
+        pipeline.zadd(get_company_leaderboard_key(user_quiz_result.company_id),
+                      {user_quiz_result.participant_id: float(user_quiz_result.company_average_score)})
+    pipeline.execute()
+
+
+def get_leaderboard_scores(participant_ids=None):
+    """
+    Get the current ratings of the participants from their latest completed quiz results.
+    Args:
+        participant_ids (list | None): IDs of the participants, all participants if None.
+    Returns:
+        tuple: Dictionary {participant ID: user rating}
+            and dictionary {company ID: {participant ID: company average score}}.
+    """
+    from quiz.models import UserQuizResult
+
+    results = UserQuizResult.objects.filter(
+        participant__isnull=False,
+        progress_status=QuizProgressStatus.COMPLETED.value,
+    )
+    if participant_ids is not None:
+        results = results.filter(participant_id__in=participant_ids)
+
+    user_ratings = dict(
+        results.order_by('participant_id', '-updated_at', '-id').distinct('participant_id')
+        .values_list('participant_id', 'user_rating')
+    )
+    company_scores = defaultdict(dict)
+    for company_id, participant_id, company_average_score in results.filter(company__isnull=False) \
+            .order_by('company_id', 'participant_id', '-updated_at', '-id').distinct('company_id', 'participant_id') \
+            .values_list('company_id', 'participant_id', 'company_average_score'):
+        company_scores[company_id][participant_id] = float(company_average_score)
+
+    return {participant_id: float(rating) for participant_id, rating in user_ratings.items()}, company_scores
+
+
+def update_participants_leaderboards(participant_ids):
+    """
+    Update the leaderboard entries of the participants from the database, e.g. after their results were regraded.
+    Args:
+        participant_ids (list): IDs of the participants.
+    Returns:
+        None
+    """
+    user_ratings, company_scores = get_leaderboard_scores(participant_ids)
+
+    pipeline = get_redis_client().pipeline(transaction=True)
+    if user_ratings:
+        pipeline.zadd(GLOBAL_LEADERBOARD_KEY, user_ratings)
+    for company_id, scores in company_scores.items():
+        pipeline.zadd(get_company_leaderboard_key(company_id), scores)
+    pipeline.execute()
+
+
+def replace_leaderboard(pipeline, redis_key, scores):
+    # the new set is renamed over the old one, so readers never see a partially built leaderboard
+    if not scores:
+        pipeline.delete(redis_key)
+        return
+
+    rebuild_key = f'{redis_key}_rebuild'
+    pipeline.delete(rebuild_key)
+    pipeline.zadd(rebuild_key, scores)
+    pipeline.rename(rebuild_key, redis_key)
+
+
+def rebuild_leaderboards():
+    """
+    Rebuild all leaderboards from the latest completed quiz results of the participants.
+    Returns:
+        int: The number of rebuilt company leaderboards.
+    """
+    user_ratings, company_scores = get_leaderboard_scores()
+    client = get_redis_client()
+
+    stale_keys = set(client.scan_iter(match=f'{COMPANY_LEADERBOARD_KEY_PREFIX}*')) \
+        - {get_company_leaderboard_key(company_id).encode() for company_id in company_scores}
+
+    pipeline = client.pipeline(transaction=True)
+    replace_leaderboard(pipeline, GLOBAL_LEADERBOARD_KEY, user_ratings)
+    for company_id, scores in company_scores.items():
+        replace_leaderboard(pipeline, get_company_leaderboard_key(company_id), scores)
+    for redis_key in stale_keys:
+        pipeline.delete(redis_key)
+    pipeline.execute()
+
+    return len(company_scores)
+
+
+def get_leaderboard_entries(entries, first_rank):
+    return [{'rank': first_rank + index, 'user_id': int(member), 'score': score}
+            for index, (member, score) in enumerate(entries)]
+
+
+def get_leaderboard(redis_key, limit, user_id=None, neighbours=0):
+    """
+    Get the top of a leaderboard and optionally the rank of a user with the neighbouring entries in O(log n) time.
+    Args:
+        redis_key (str): The key of the leaderboard sorted set.
+        limit (int): The number of top entries.
+        user_id (int | None): The ID of the user whose rank to get.
+        neighbours (int): The number of entries above and below the user.
+    Returns:
+        dict: The top entries, the total number of entries and the user entries if a user is given.
+    """
+    client = get_redis_client()
+
+    pipeline = client.pipeline(transaction=False)
+    pipeline.zrevrange(redis_key, 0, limit - 1, withscores=True)
+    pipeline.zcard(redis_key)
+    if user_id is not None:
+        pipeline.zrevrank(redis_key, user_id)
+    top, count, *user_rank = pipeline.execute()
+
+    leaderboard = {'count': count, 'results': get_leaderboard_entries(top, 1)}
+    if user_id is None:
+        return leaderboard
+
+    rank = user_rank[0]
+    leaderboard['user'] = None
+    if rank is not None:
+        first_index = max(rank - neighbours, 0)
+        entries = client.zrevrange(redis_key, first_index, rank + neighbours, withscores=True)
+        leaderboard['user'] = {'rank': rank + 1, 'neighbours': get_leaderboard_entries(entries, first_index + 1)}
+
+    return leaderboard
@@ -0,0 +1,121 @@
+import logging
+
+from django.conf import settings
+from redis import WatchError
+
+from common.cache.client import get_redis_client
+from common.cache.quiz_answer_key import get_quiz_answer_key
+from services.analytics.statistics import (
+    STATISTICS_BATCH_SIZE,
+    get_question_counters,
+    get_question_statistics,
+    get_response_counters,
+)
+from services.grading.regrade import iter_batches
+
+# the hash holds the counters of all results only after a rebuild, the increments alone are incomplete
+QUESTION_STATS_BUILT_FIELD = 'built'
+QUESTION_STATS_REBUILD_ATTEMPTS = 3
+
+# KEYS: counters hash, set of counted result IDs; ARGV: result ID, expiration, field, increment, ...
+# the increments of a result already counted by a rebuild or a previous call are skipped
+ADD_RESPONSE_COUNTERS_SCRIPT = """
+if redis.call('SADD', KEYS[2], ARGV[1]) == 0 then
+    return 0
+end
+for index = 3, #ARGV, 2 do
+    redis.call('HINCRBYFLOAT', KEYS[1], ARGV[index], ARGV[index + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+def get_question_stats_redis_key(quiz_id, version):
+    return f'quiz_question_stats_{quiz_id}_{version}'
+
+
+def get_question_stats_results_redis_key(quiz_id, version):
+    return f'quiz_question_stats_results_{quiz_id}_{version}'
+
+
+def add_quiz_response_counters(user_quiz_result, user_responses):
+    """
+    Atomically increment the question counters of a quiz with a completed response.
+    The result is counted at most once, also when a rebuild has already read it from the database.
+    Args:
+        user_quiz_result (UserQuizResult): The completed quiz result.
+        user_responses (dict): User responses to the quiz questions.
+    Returns:
+        bool: True if the response was counted, False if the result was already counted.
+    """
+    answer_key = user_quiz_result.quiz.get_answer_key()
+
+    increments = []
+    for field, increment in get_response_counters(answer_key, user_responses).items():
+        increments.extend((field, increment))
+
+    add_response_counters = get_redis_client().register_script(ADD_RESPONSE_COUNTERS_SCRIPT)
+    return bool(add_response_counters(
+        keys=[get_question_stats_redis_key(answer_key.quiz_id, answer_key.version),
+              get_question_stats_results_redis_key(answer_key.quiz_id, answer_key.version)],
+        args=[user_quiz_result.id, settings.REDIS_DATA_EXPIRATION, *increments],
+    ))
+
+
+def rebuild_quiz_question_counters(quiz, answer_key):
+    """
+    Rebuild the question counters of a quiz version from the stored responses of its results.
+    The IDs of the results read are stored with the counters, so a later increment of one of them is skipped.
+    The rebuild is retried if a result is counted meanwhile, the counters are returned without being stored
+    when all attempts fail.
+    Args:
+        quiz (Quiz): The quiz to rebuild.
+        answer_key (QuizAnswerKey): The answer key of the quiz version.
+    Returns:
+        dict: The rebuilt counters.
+    """
+    redis_key = get_question_stats_redis_key(answer_key.quiz_id, answer_key.version)
+    results_redis_key = get_question_stats_results_redis_key(answer_key.quiz_id, answer_key.version)
+
+    with get_redis_client().pipeline(transaction=True) as pipeline:
+        for _attempt in range(QUESTION_STATS_REBUILD_ATTEMPTS):
+            try:
+                pipeline.watch(redis_key, results_redis_key)
+                counters, result_ids = get_question_counters(answer_key, quiz.quiz_result.all())
+
+                pipeline.multi()
+                pipeline.delete(redis_key, results_redis_key)
+                pipeline.hset(redis_key, mapping={**counters, QUESTION_STATS_BUILT_FIELD: 1})
+                for result_ids_batch in iter_batches(result_ids, STATISTICS_BATCH_SIZE):
+                    pipeline.sadd(results_redis_key, *result_ids_batch)
+                pipeline.expire(redis_key, settings.REDIS_DATA_EXPIRATION)
+                pipeline.expire(results_redis_key, settings.REDIS_DATA_EXPIRATION)
+                pipeline.execute()
+                return counters
+            except WatchError:
+                pipeline.reset()
+
+    logging.warning(f'Question counters of quiz {quiz.id} were not stored, '
+                    f'{QUESTION_STATS_REBUILD_ATTEMPTS} rebuild attempts were interrupted by new results')
+    return counters
+
+
+def get_quiz_question_statistics(quiz):
+    """
+    Get the difficulty and distractor statistics of the quiz questions from their Redis counters.
+    The counters are rebuilt from the stored responses when missing, e.g. for a new quiz version.
+    Args:
+        quiz (Quiz): The quiz for which to get the statistics.
+    Returns:
+        list: The statistics of the quiz questions.
+    """
+    answer_key = get_quiz_answer_key(quiz)
+    redis_key = get_question_stats_redis_key(answer_key.quiz_id, answer_key.version)
+
+    counters = {field.decode(): value for field, value in get_redis_client().hgetall(redis_key).items()}
+    if QUESTION_STATS_BUILT_FIELD not in counters:
+        counters = rebuild_quiz_question_counters(quiz, answer_key)
+
+    return get_question_statistics(answer_key, {field: float(value) for field, value in counters.items()})
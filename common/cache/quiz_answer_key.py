@@ -0,0 +1,44 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from services.grading.answer_key import QuizAnswerKey
+
+
+def get_answer_key_redis_key(quiz_id, version):
+    return f'quiz_answer_key_{quiz_id}_{version}'
+
+
+@lru_cache(maxsize=settings.QUIZ_ANSWER_KEY_LOCAL_CACHE_SIZE)
+def load_quiz_answer_key(quiz_id, version):
+    """
+    Load the answer key of a quiz version from Redis or compile it from the database.
+    The result is memoized in the process, a new quiz version gets a new key.
+    Args:
+        quiz_id (int): The ID of the quiz.
+        version (float): The quiz version (timestamp of the last quiz change).
+    Returns:
+        QuizAnswerKey: The answer key of the quiz version.
+    """
+    from quiz.models import Quiz
+
+    redis_key = get_answer_key_redis_key(quiz_id, version)
+
+    answer_key = cache.get(redis_key)
+    if answer_key is None:
+        answer_key = QuizAnswerKey.from_quiz(Quiz.objects.get(id=quiz_id))
+        cache.set(redis_key, answer_key, settings.REDIS_DATA_EXPIRATION)
+
+    return answer_key
+
+
+def get_quiz_answer_key(quiz):
+    """
+    Get the answer key for the current version of a quiz.
+    Args:
+        quiz (Quiz): The quiz for which to get the answer key.
+    Returns:
+        QuizAnswerKey: The answer key of the quiz.
+    """
+    return load_quiz_answer_key(quiz.id, quiz.updated_at.timestamp())
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+
+def get_quiz_content_redis_key(quiz_id, version, company_version, full_access):
+    return f'quiz_content_{quiz_id}_{version}_{company_version}_{int(full_access)}'
+
+
+def get_quiz_content(quiz, full_access):
+    """
+    Get the pre-rendered JSON of the quiz content for the current version of the quiz and its company.
+    A quiz or company change creates a new version, so the content is never served for an old version.
+    The company owner is rendered with the content, so the owner rating is refreshed with a new version.
+    Args:
+        quiz (Quiz): The quiz to render.
+        full_access (bool): True if the content includes the correct answers.
+    Returns:
+        bytes: The rendered JSON object ending with the company object.
+    """
+    from quiz.serializers import QuizContentSerializer
+
+    redis_key = get_quiz_content_redis_key(quiz.id, quiz.updated_at.timestamp(), quiz.company.updated_at.timestamp(),
+                                           full_access)
+
+    content = cache.get(redis_key)
+    if content is None:
+        content = JSONRenderer().render(QuizContentSerializer(quiz, context={'full_access': full_access}).data)
+        cache.set(redis_key, content, settings.REDIS_DATA_EXPIRATION)
+
+    return content
+
+
+def get_quiz_payload(quiz, context):
+    """
+    Get the JSON of the detailed quiz, the cached quiz content is completed with the fields of the requesting user.
+    Args:
+        quiz (Quiz): The quiz to render.
+        context (dict): The serializer context with the request and the access level.
+    Returns:
+        bytes: The rendered JSON object.
+    """
+    from company.serializers import CompanyParticipantFieldsSerializer
+    from quiz.serializers import QuizParticipantFieldsSerializer
+
+    content = get_quiz_content(quiz, bool(context.get('full_access')))
+    company_fields = JSONRenderer().render(CompanyParticipantFieldsSerializer(quiz.company, context=context).data)
+    participant_fields = JSONRenderer().render(QuizParticipantFieldsSerializer(quiz, context=context).data)
+
+    # all parts are non-empty JSON objects and the content ends with the company object,
+    # so the company fields are appended to the company and the participant fields to the quiz without parsing
+    return content[:-2] + b',' + company_fields[1:] + b',' + participant_fields[1:]
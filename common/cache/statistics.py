@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+from common.cache.question_stats import get_quiz_question_statistics
+from services.analytics.statistics import get_results_statistics, get_statistics_results
+
+
+def get_statistics_version_key(scope, object_id):
+    return f'statistics_version_{scope}_{object_id}'
+
+
+def get_statistics_version(scope, object_id):
+    return cache.get(get_statistics_version_key(scope, object_id), 0)
+
+
+def bump_statistics_versions(quiz_ids=(), company_ids=()):
+    """
+    Invalidate the cached statistics of quizzes and companies whose results were changed in place.
+    The versions expire with the statistics, so an expired version cannot bring back the statistics it replaced.
+    Args:
+        quiz_ids (Iterable): IDs of the quizzes.
+        company_ids (Iterable): IDs of the companies.
+    """
+    version = time.time_ns()
+    cache.set_many(
+        {
+            **{get_statistics_version_key('quiz', quiz_id): version for quiz_id in quiz_ids},
+            **{get_statistics_version_key('company', company_id): version for company_id in company_ids},
+        },
+        settings.REDIS_DATA_EXPIRATION,
+    )
+
+
+def get_results_state(results):
+    """
+    Get the state of the completed results, it changes whenever a result is completed or deleted.
+    Results regraded in place keep their count and timestamps, so they bump the statistics versions instead.
+    Args:
+        results (QuerySet): The quiz results.
+    Returns:
+        str: The number of results and the timestamp of the latest result.
+    """
+    state = get_statistics_results(results).aggregate(count=Count('id'), latest=Max('updated_at'))
+    latest = state['latest'].timestamp() if state['latest'] else 0
+    return f'{state["count"]}_{latest}'
+
+
+def get_company_statistics(company):
+    """
+    Get the score and quiz time statistics of a company, cached until the company results change.
+    Args:
+        company (Company): The company for which to get the statistics.
+    Returns:
+        dict: The statistics of the company results.
+    """
+    from quiz.models import UserQuizResult
+
+    results = UserQuizResult.objects.filter(company=company)
+    redis_key = (f'company_statistics_{company.id}_{get_statistics_version("company", company.id)}_'
+                 f'{get_results_state(results)}')
+
+    statistics = cache.get(redis_key)
+    if statistics is None:
+        statistics = get_results_statistics(results)
+        cache.set(redis_key, statistics, settings.REDIS_DATA_EXPIRATION)
+
+    return statistics
+
+
+def get_quiz_statistics(quiz):
+    """
+    Get the score, quiz time and question statistics of a quiz,
+    cached until the quiz results or the quiz version change.
+    Args:
+        quiz (Quiz): The quiz for which to get the statistics.
+    Returns:
+        dict: The statistics of the quiz results.
+    """
+    results = quiz.quiz_result.all()
+    redis_key = (f'quiz_statistics_{quiz.id}_{quiz.updated_at.timestamp()}_{get_statistics_version("quiz", quiz.id)}_'
+                 f'{get_results_state(results)}')
+
+    statistics = cache.get(redis_key)
+    if statistics is None:
+        statistics = {
+            **get_results_statistics(results),
+            'questions': get_quiz_question_statistics(quiz),
+        }
+        cache.set(redis_key, statistics, settings.REDIS_DATA_EXPIRATION)
+
+    return statistics
@@ -2,27 +2,30 @@ from django.conf import settings
 from django.core.cache import cache
 
 
-def get_user_answers(quiz, user_responses):
+def get_user_answers(answer_key, user_responses):
     """
     Extract and structure user answers for a quiz.
     Args:
-        quiz (Quiz): The quiz for which to extract user answers.
+        answer_key (QuizAnswerKey): The answer key of the quiz for which to extract user answers.
         user_responses (dict): User responses to quiz questions.
     Returns:
         list: List of tuples containing question ID, question text, and user answers.
     """
     user_answers_data = []
 
-    for quiz_question, user_question in zip(quiz.questions.all(), user_responses.get('questions'), strict=True):
+    for question_index, user_question in zip(range(answer_key.total_questions), user_responses.get('questions'),
+                                             strict=True):
         question = {}
 
-        for quiz_answer, user_answer in zip(quiz_question.answers.all(), user_question.get('answers'), strict=True):
+        for answer_index, user_answer in zip(answer_key.get_answer_range(question_index),
+                                             user_question.get('answers'), strict=True):
             answer = user_answer.get('is_right')
 
             if answer:
-                question[quiz_answer.text] = quiz_answer.is_right == answer
+                question[answer_key.answer_texts[answer_index]] = answer_key.answer_is_right[answer_index] == answer
 
-        user_answers_data.append((quiz_question.id, f'{quiz_question.id}_{quiz_question.question_text}', question))
+        question_id = answer_key.question_ids[question_index]
+        user_answers_data.append((question_id, f'{question_id}_{answer_key.question_texts[question_index]}', question))
 
     return user_answers_data
 
@@ -36,16 +39,16 @@ def cache_user_quiz_response(user_quiz_result, user_responses):
     Returns:
         None
     """
-    answers_data = get_user_answers(user_quiz_result.quiz, user_responses)
+    answers_data = get_user_answers(user_quiz_result.quiz.get_answer_key(), user_responses)
     data_to_store = {}
 
     for question_id, question, answers in answers_data:
         redis_key = f'user_quiz_result_{user_quiz_result.id}_{question_id}'
 
         data_to_store[redis_key] = {
-            'participant_id': user_quiz_result.participant.id,
-            'company_id': user_quiz_result.company.id,
-            'quiz_id': user_quiz_result.quiz.id,
+            'participant_id': user_quiz_result.participant_id,
+            'company_id': user_quiz_result.company_id,
+            'quiz_id': user_quiz_result.quiz_id,
             'question': question,
             'answers': answers,
         }
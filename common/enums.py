@@ -27,3 +27,11 @@ class QuizProgressStatus(StrEnum):
 class NotificationStatus(StrEnum):
     SENT = auto()
     VIEWED = auto()
+
+
+# enums for QuizImportJob model
+class QuizImportStatus(StrEnum):
+    PENDING = auto()
+    PROCESSING = auto()
+    COMPLETED = auto()
+    FAILED = auto()
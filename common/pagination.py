@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.response import Response
 
 
@@ -41,3 +41,19 @@ class SettingsPageNumberPagination(PageNumberPagination):
                 'previous': self.get_previous_link(),
             }
         })
+
+
+class SettingsCursorPagination(CursorPagination):
+    """
+    Class for cursor pagination settings of the lists that change while they are paged, e.g. analytics entities
+
+    Attributes:
+        ordering (str): The unique field the cursor is based on.
+        page_size_query_param (str): The name of the page size parameter in the URL.
+        max_page_size (int): The maximum number of items per page.
+        page_size (int): The default number of items per page.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    page_size = 10
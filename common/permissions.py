@@ -5,6 +5,7 @@ from rest_framework import permissions
 from rest_framework.exceptions import NotAcceptable
 
 from common.enums import QuizProgressStatus
+from common.roles import ADMIN, OWNER, get_company_roles
 from company.models import Company
 from quiz.models import Quiz, UserQuizResult
 from user.models import RequestToCompany
@@ -32,22 +33,22 @@ class IsCompanyOwner(permissions.BasePermission):
     """
     def has_permission(self, request, view):
         if view.action in ['create', 'revoke', 'remove_user', 'list', 'admins', 'appoint_admin', 'remove_admin',
-                           'quiz_complete', 'company_quiz_results', 'company_member_quiz_results']:
+                           'quiz_complete', 'company_quiz_results', 'company_member_quiz_results', 'quiz_import',
+                           'quiz_import_detail', 'quiz_statistics', 'quiz_question_statistics']:
             company_pk = request.parser_context.get('kwargs', {}).get('company_pk')
 
             if company_pk is None:
                 return False
 
-            company = get_object_or_404(Company, pk=company_pk)
-            return company.is_owner(request.user)
+            return get_company_roles(request).has_role(company_pk, OWNER)
 
         return super().has_permission(request, view)
 
     def has_object_permission(self, request, view, instance):
         if hasattr(instance, 'company'):
-            return instance.company.is_owner(request.user)
+            return get_company_roles(request).is_owner(instance.company_id)
         elif hasattr(instance, 'owner'):
-            return instance.is_owner(request.user)
+            return get_company_roles(request).is_owner(instance.id)
         return False
 
 
@@ -85,22 +86,22 @@ class IsCompanyAdmin(permissions.BasePermission):
     Grants access to the object only to the administrator
     """
     def has_permission(self, request, view):
-        if view.action in ['create', 'list', 'company_quiz_results', 'company_member_quiz_results']:
+        if view.action in ['create', 'list', 'company_quiz_results', 'company_member_quiz_results', 'quiz_import',
+                           'quiz_import_detail', 'quiz_statistics', 'quiz_question_statistics']:
             company_pk = request.parser_context.get('kwargs', {}).get('company_pk')
 
             if company_pk is None:
                 return False
 
-            company = get_object_or_404(Company, pk=company_pk)
-            return company.companymember_set.filter(member=request.user, admin=True).exists()
+            return get_company_roles(request).has_role(company_pk, ADMIN)
 
         return super().has_permission(request, view)
 
     def has_object_permission(self, request, view, instance):
         if hasattr(instance, 'company'):
-            return instance.company.companymember_set.filter(member=request.user, admin=True).exists()
+            return get_company_roles(request).is_admin(instance.company_id)
         elif hasattr(instance, 'owner'):
-            return instance.companymember_set.filter(member=request.user, admin=True).exists()
+            return get_company_roles(request).is_admin(instance.id)
         return False
 
 
@@ -0,0 +1,91 @@
+from django.db.models import Case, CharField, Value, When
+from django.shortcuts import get_object_or_404
+
+from common.cache.company_roles import get_cached_company_roles
+from company.models import Company, CompanyMember
+
+OWNER = 'owner'
+ADMIN = 'admin'
+MEMBER = 'member'
+
+
+def load_company_roles(user_id):
+    """
+    Load the roles of a user in all their companies with a single query.
+    Args:
+        user_id (int): The ID of the user.
+    Returns:
+        dict: Dictionary {company ID: role}, the role is OWNER, ADMIN or MEMBER.
+    """
+    owned_companies = Company.objects.filter(owner_id=user_id).annotate(
+        role=Value(OWNER, output_field=CharField()),
+    ).values_list('id', 'role')
+    memberships = CompanyMember.objects.filter(member_id=user_id).annotate(
+        role=Case(When(admin=True, then=Value(ADMIN)), default=Value(MEMBER), output_field=CharField()),
+    ).values_list('company_id', 'role')
+
+    roles = {}
+    for company_id, role in owned_companies.union(memberships, all=True):
+        # the owner role takes precedence over a membership in the own company
+        if roles.get(company_id) != OWNER:
+            roles[company_id] = role
+
+    return roles
+
+
+class CompanyRoles:
+    """
+    Roles of a user in their companies, read from the role cache at the first check.
+
+    Attributes:
+        user (User): The user whose roles are resolved.
+    """
+    def __init__(self, user):
+        self.user = user
+        self._roles = None
+
+    @property
+    def roles(self):
+        if self._roles is None:
+            self._roles = get_cached_company_roles(self.user.id) if self.user and self.user.is_authenticated else {}
+        return self._roles
+
+    def get_role(self, company_id):
+        return self.roles.get(int(company_id))
+
+    def is_owner(self, company_id):
+        return self.get_role(company_id) == OWNER
+
+    def is_admin(self, company_id):
+        return self.get_role(company_id) == ADMIN
+
+    def is_member(self, company_id):
+        # the owner is not a member of the company, the administrators are
+        return self.get_role(company_id) in (ADMIN, MEMBER)
+
+    def has_role(self, company_id, *roles):
+        """
+        Check the role of the user in a company, raise Http404 if the user has none of the roles
+        and the company does not exist.
+        """
+        if self.get_role(company_id) in roles:
+            return True
+
+        get_object_or_404(Company, pk=company_id)
+        return False
+
+
+def get_company_roles(request):
+    """
+    Get the company roles of the request user, memoized on the request.
+    Args:
+        request (Request): The current request.
+    Returns:
+        CompanyRoles: The roles of the request user.
+    """
+    company_roles = getattr(request, 'company_roles', None)
+    if company_roles is None or company_roles.user != request.user:
+        company_roles = CompanyRoles(request.user)
+        request.company_roles = company_roles
+
+    return company_roles
@@ -0,0 +1,58 @@
+from django.db.models import prefetch_related_objects
+
+
+def get_expand_fields(context):
+    """
+    Get the names of the relations to expand from the expand query parameter, e.g. ?expand=company,quiz.
+    Args:
+        context (dict): The serializer context.
+    Returns:
+        set: The names of the relations to expand.
+    """
+    request = context.get('request') if context else None
+    if request is None:
+        return set()
+
+    field_names = request.query_params.get('expand', '').split(',')
+    return {field_name.strip() for field_name in field_names if field_name.strip()}
+
+
+class ExpandableFieldsMixin:
+    """
+    Serializes the nested relations with the declared reference serializers. The relations named
+    in the expand query parameter are serialized with their full serializers from expanded_fields.
+    The full serializers with a preload_instances class method preload the method fields of a page of relations.
+
+    Attributes:
+        expanded_fields (dict): Dictionary {field name: full serializer class}.
+    """
+    expanded_fields = {}
+
+    def preload_expanded_fields(self, instances):
+        """
+        Preload the expanded relations of a page of instances and the method fields of their full serializers,
+        so an expanded page is serialized with a fixed number of queries.
+        Args:
+            instances (list): The serialized instances.
+        """
+        expand = get_expand_fields(self.context)
+        for field_name, serializer_class in self.expanded_fields.items():
+            if field_name not in expand or not hasattr(serializer_class, 'preload_instances'):
+                continue
+
+            # the relations not selected with the instances are loaded with one query
+            prefetch_related_objects(instances, field_name)
+            related_instances = [getattr(instance, field_name) for instance in instances
+                                 if getattr(instance, field_name) is not None]
+            if related_instances:
+                serializer_class.preload_instances(related_instances, self.context)
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        expand = get_expand_fields(self.context)
+        for field_name, serializer_class in self.expanded_fields.items():
+            if field_name in expand:
+                fields[field_name] = serializer_class(read_only=True)
+
+        return fields
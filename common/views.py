@@ -1,7 +1,12 @@
 from rest_framework import status
 from rest_framework.response import Response
 
-from services.export.response_builder import convert_data_to_file
+from helios_backend.settings import EXPORT_CHUNK_SIZE
+from services.export.response_builder import (
+    QUERYSET_FORMAT_HANDLERS,
+    convert_data_to_file,
+    convert_queryset_to_file,
+)
 
 
 def get_serializer_paginate(instance, queryset, serializer, context=None):
@@ -16,8 +21,14 @@ def get_serializer_paginate(instance, queryset, serializer, context=None):
 
 def get_user_quiz_result_response(instance, request, queryset, context=None):
     export_format = request.query_params.get('export_format')
+    if export_format in QUERYSET_FORMAT_HANDLERS:
+        return convert_queryset_to_file(queryset, export_format)
     if export_format:
-        serializer = instance.get_serializer(queryset, many=True, context=context)
-        return convert_data_to_file(data=serializer.data, format_file=export_format)
+        # the rows are loaded and serialized lazily while the response is streamed
+        data = (instance.get_serializer(result, context=context).data
+                for result in queryset.select_related('participant', 'company', 'quiz')
+                .iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return convert_data_to_file(data=data, format_file=export_format)
 
+    queryset = queryset.select_related('participant', 'company', 'quiz')
     return get_serializer_paginate(instance, queryset, instance.get_serializer, context=context)
@@ -17,6 +17,14 @@ class Company(TimeStampedModel):
     def __str__(self):
         return self.name[:30]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the loaded owner is compared on save to find an owner change without querying the company again
+        if 'owner_id' in field_names:
+            instance.loaded_owner_id = values[field_names.index('owner_id')]
+        return instance
+
     def is_owner(self, user):
         return self.owner == user
 
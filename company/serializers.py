@@ -1,10 +1,14 @@
 from django.contrib.auth import get_user_model
+from django.db.models import prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
 from common.enums import InvitationStatus, QuizProgressStatus, RequestStatus
-from user.serializers import UserSerializer
+from common.roles import get_company_roles
+from common.serializers import ExpandableFieldsMixin
+from services.analytics.user_analytics import preload_company_fields, preload_user_fields
+from user.serializers import NestedUserListSerializer, UserReferenceSerializer, UserSerializer, get_request_company_id
 
 from .models import Company, CompanyMember, InvitationToCompany
 
@@ -20,6 +24,21 @@ class CompanySerializer(serializers.ModelSerializer):
     class Meta:
         model = Company
         fields = ('id', 'name', 'description', 'visibility', 'owner', 'is_admin', 'is_member', 'is_active_request')
+        list_serializer_class = NestedUserListSerializer
+        user_field = 'owner'
+
+    @staticmethod
+    def preload_instances(companies, context):
+        """
+        Preload the method fields of a page of companies and of their owners.
+        Args:
+            companies (list): The companies to preload.
+            context (dict): The serializer context.
+        """
+        request = context.get('request') if context else None
+        prefetch_related_objects(companies, 'owner')
+        preload_company_fields(companies, request.user if request else None)
+        preload_user_fields([company.owner for company in companies], get_request_company_id(context))
 
     def create(self, validated_data):
         validated_data['owner'] = self.context['request'].user
@@ -30,17 +49,19 @@ class CompanySerializer(serializers.ModelSerializer):
         if self.context and self.context.get('request'):
             user = self.context['request'].user
             if user and user.is_authenticated:
-                return company.companymember_set.filter(member=self.context.get('request').user, admin=True).exists()
+                return get_company_roles(self.context['request']).is_admin(company.id)
         return None
 
     def get_is_member(self, company):
         if self.context and self.context.get('request'):
             user = self.context['request'].user
             if user and user.is_authenticated:
-                return company.companymember_set.filter(member=self.context.get('request').user).exists()
+                return get_company_roles(self.context['request']).is_member(company.id)
         return None
 
     def get_is_active_request(self, company):
+        if hasattr(company, 'preloaded_is_active_request'):
+            return company.preloaded_is_active_request
         if self.context and self.context.get('request'):
             user = self.context['request'].user
             if user and user.is_authenticated:
@@ -51,6 +72,26 @@ class CompanySerializer(serializers.ModelSerializer):
         return None
 
 
+COMPANY_PARTICIPANT_FIELDS = ('is_admin', 'is_member', 'is_active_request')
+
+
+class CompanyParticipantFieldsSerializer(CompanySerializer):
+    """
+    The fields of a company that depend on the requesting user.
+    """
+    class Meta(CompanySerializer.Meta):
+        fields = COMPANY_PARTICIPANT_FIELDS
+
+
+class CompanyReferenceSerializer(serializers.ModelSerializer):
+    """
+    Reference to a company nested in other objects, the full company is serialized with ?expand=company.
+    """
+    class Meta:
+        model = Company
+        fields = ('id', 'name')
+
+
 class CompanyMemberSerializer(serializers.ModelSerializer):
     member = UserSerializer(read_only=True)
     last_quiz_completion_time = serializers.SerializerMethodField(read_only=True)
@@ -58,6 +99,8 @@ class CompanyMemberSerializer(serializers.ModelSerializer):
     class Meta:
         model = CompanyMember
         exclude = ('company', )
+        list_serializer_class = NestedUserListSerializer
+        user_field = 'member'
 
     @staticmethod
     def get_last_quiz_completion_time(company_member):
@@ -72,13 +115,16 @@ class CompanyMemberSerializer(serializers.ModelSerializer):
         return last_user_quiz_result.order_by('updated_at').last().updated_at
 
 
-class InvitationToCompanySerializer(serializers.ModelSerializer):
-    company = CompanySerializer(read_only=True)
-    recipient = UserSerializer(read_only=True)
+class InvitationToCompanySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    company = CompanyReferenceSerializer(read_only=True)
+    recipient = UserReferenceSerializer(read_only=True)
+    expanded_fields = {'company': CompanySerializer, 'recipient': UserSerializer}
 
     class Meta:
         model = InvitationToCompany
         fields = '__all__'
+        list_serializer_class = NestedUserListSerializer
+        user_field = 'recipient'
 
     def create(self, validated_data):
         company_pk = self.context['request'].parser_context['kwargs']['company_pk']
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from common.cache.company_roles import invalidate_company_roles
+
+from .models import Company, CompanyMember
+
+
+# joining, leaving and admin changes, including accepted invitations and approved requests
+@receiver(post_save, sender=CompanyMember)
+@receiver(post_delete, sender=CompanyMember)
+def invalidate_member_roles(sender, instance, **kwargs):
+    invalidate_company_roles([instance.member_id])
+
+
+@receiver(pre_save, sender=Company)
+def remember_previous_owner(sender, instance, **kwargs):
+    # companies loaded from the database know their owner, only the ones built with a primary key are queried
+    if instance.pk and not hasattr(instance, 'loaded_owner_id'):
+        instance.loaded_owner_id = Company.objects.filter(pk=instance.pk).values_list('owner_id', flat=True).first()
+
+
+@receiver(post_save, sender=Company)
+def invalidate_owner_roles_on_save(sender, instance, created, **kwargs):
+    previous_owner_id = getattr(instance, 'loaded_owner_id', None)
+    if created or previous_owner_id != instance.owner_id:
+        invalidate_company_roles([instance.owner_id, previous_owner_id])
+    instance.loaded_owner_id = instance.owner_id
+
+
+@receiver(post_delete, sender=Company)
+def invalidate_owner_roles_on_delete(sender, instance, **kwargs):
+    invalidate_company_roles([instance.owner_id])
@@ -1,15 +1,20 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from common.cache.company_roles import get_cached_company_roles
 from common.enums import InvitationStatus
+from common.roles import ADMIN
 from tests.test_models import (
     CompanyFactory,
     CompanyMemberAdminFactory,
     CompanyMemberFactory,
     InvitationToCompanyFactory,
+    RequestToCompanyFactory,
     UserFactory,
 )
 
@@ -59,6 +64,30 @@ class CompanyTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], self.company_1.name)
 
+    def test_company_list_query_count(self):
+        self.client.force_authenticate(user=self.user_3)
+        url = reverse('company-list')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        queries_count = len(queries)
+
+        for _ in range(5):
+            company = CompanyFactory()
+            CompanyMemberAdminFactory(company=company, member=self.user_3)
+        RequestToCompanyFactory(company=self.company_1, sender=self.user_3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), queries_count)
+        companies = {company['id']: company for company in response.data['results']}
+        self.assertTrue(companies[self.company_1.id]['is_active_request'])
+        self.assertTrue(companies[self.company_2.id]['is_member'])
+        self.assertFalse(companies[self.company_2.id]['is_admin'])
+        self.assertTrue(companies[company.id]['is_admin'])
+
     def test_update_company(self):
         self.client.force_authenticate(user=self.user_1)
 
@@ -340,3 +369,28 @@ class CompanyAdminTests(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertFalse(CompanyMember.objects.filter(member=self.user_4, admin=False).exists())
+
+    def test_company_roles_cache(self):
+        self.client.force_authenticate(user=self.user_5)
+        self.assertEqual(self.client.get(self.url_admin_list_1).status_code, status.HTTP_403_FORBIDDEN)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url_admin_list_1)
+        self.assertFalse([query for query in queries if 'company_companymember' in query['sql']])
+
+        self.company_1.owner = self.user_5
+        self.company_1.save()
+        self.assertEqual(self.client.get(self.url_admin_list_1).status_code, status.HTTP_200_OK)
+
+        self.client.force_authenticate(user=self.user_1)
+        self.assertEqual(self.client.get(self.url_admin_list_1).status_code, status.HTTP_403_FORBIDDEN)
+
+        # an edit without an owner change is saved without looking up the previous owner
+        company = Company.objects.get(id=self.company_1.id)
+        company.name = 'New name'
+        with self.assertNumQueries(1):
+            company.save()
+
+        self.assertEqual(get_cached_company_roles(self.user_4.id), {self.company_1.id: ADMIN})
+        self.member_company_4_1.delete()
+        self.assertEqual(get_cached_company_roles(self.user_4.id), {})
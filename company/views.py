@@ -14,6 +14,7 @@ from common.permissions import (
     ReadOnly,
 )
 from common.views import get_serializer_paginate
+from services.company_fields import annotate_company_fields
 
 from .models import Company, InvitationToCompany
 from .serializers import (
@@ -61,6 +62,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
             if owner_id:
                 queryset = queryset.filter(owner_id=owner_id)
 
+        if self.action in ('list', 'retrieve'):
+            queryset = annotate_company_fields(queryset, self.request.user)
+
         queryset = queryset.order_by(*self.ordering)
 
         return queryset
@@ -109,7 +113,7 @@ class InvitationToCompanyViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         company_pk = self.kwargs.get('company_pk')
-        return InvitationToCompany.objects.all()\
+        return InvitationToCompany.objects.select_related('company')\
             .filter(company_id=company_pk)\
             .order_by(*self.ordering)
 
@@ -360,4 +360,13 @@ CELERY_RESULT_BACKEND = f'redis://default:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_P
 # Quiz settings
 MIN_COUNT_QUESTIONS = 2
 MIN_COUNT_ANSWERS = 2
-EXCEL_FILE_MAX_SIZE_MB = 0.5
+EXCEL_FILE_MAX_SIZE_MB = 20
+QUIZ_ANSWER_KEY_LOCAL_CACHE_SIZE = 256
+QUIZ_IMPORT_FILE_MAX_SIZE_MB = 200
+# number of sheets inserted per transaction by the import jobs
+QUIZ_IMPORT_CHUNK_SIZE = 20
+
+
+# Export settings
+# number of rows loaded from the database per query while an export is streamed
+EXPORT_CHUNK_SIZE = 2000
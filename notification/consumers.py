@@ -121,6 +121,12 @@ class UserNotificationConsumer(AsyncJsonWebsocketConsumer):
         except Exception as error:
             await self.send_json({"error": str(error)})
 
+    async def send_import_progress(self, event):
+        try:
+            await self.send_json({'import_job': {key: value for key, value in event.items() if key != 'type'}})
+        except Exception as error:
+            await self.send_json({"error": str(error)})
+
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(
             self.user_group_name,
@@ -52,7 +52,6 @@ class QuestionAdmin(admin.ModelAdmin):
 class AnswerAdmin(admin.ModelAdmin):
     list_display = ('id', 'text', 'is_right')
     list_display_links = ('id', )
-    list_editable = ('text', 'is_right')
     search_fields = ('text', 'is_right')
     list_filter = ('question', 'is_right')
     list_per_page = 100
@@ -67,3 +66,9 @@ class AnswerAdmin(admin.ModelAdmin):
         ('Question', {'fields': ('question',)}),
         ('Info', {'fields': ('text', 'is_right')}),
     )
+
+    def get_readonly_fields(self, request, obj=None):
+        # a saved answer is immutable, its questions are relinked to another answer instead
+        if obj is not None:
+            return ('text', 'is_right')
+        return super().get_readonly_fields(request, obj)
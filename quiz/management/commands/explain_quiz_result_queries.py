@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from common.enums import QuizProgressStatus
+from quiz.models import UserQuizResult
+
+COMPLETED = QuizProgressStatus.COMPLETED.value
+
+
+def get_query_shapes(participant_id, quiz_id, company_id):
+    """
+    The hot query shapes of the quiz results with the given sample values.
+        :return: List of (name, queryset) tuples
+    """
+    results = UserQuizResult.objects.all()
+    return [
+        ('frequency limit, available quizzes',
+         results.filter(participant_id=participant_id, quiz_id=quiz_id, progress_status=COMPLETED)
+         .order_by('-updated_at')[:1]),
+        ('quiz completion', results.filter(participant_id=participant_id, quiz_id=quiz_id,
+                                           progress_status=QuizProgressStatus.STARTED.value)),
+        ('auth user last result', results.filter(participant_id=participant_id, quiz_id=quiz_id)
+         .order_by('-updated_at')[:1]),
+        ('user last completed result', results.filter(participant_id=participant_id, progress_status=COMPLETED)
+         .order_by('-updated_at')[:1]),
+        ('company member last completion',
+         results.filter(participant_id=participant_id, company_id=company_id, progress_status=COMPLETED)
+         .order_by('-updated_at')[:1]),
+        ('quiz last completion', results.filter(quiz_id=quiz_id, progress_status=COMPLETED)
+         .order_by('-updated_at')[:1]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Show the query plans of the hot quiz result queries, optionally compared with the plans without indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Execute the queries and show the actual timings')
+        parser.add_argument('--compare', action='store_true',
+                            help='Also show the plans without the result indexes. The indexes are dropped in a '
+                                 'rolled back transaction that locks the results table, do not use on production')
+        parser.add_argument('--disable-seqscan', action='store_true',
+                            help='Discourage sequential scans to see the index plans on a small database')
+
+    def handle(self, *args, **options):
+        sample = UserQuizResult.objects.filter(
+            participant__isnull=False, quiz__isnull=False, company__isnull=False, progress_status=COMPLETED,
+        ).values('participant_id', 'quiz_id', 'company_id').first()
+        if sample is None:
+            raise CommandError('No completed quiz results to sample the query parameters from')
+
+        query_shapes = get_query_shapes(**sample)
+        plans = {}
+        with transaction.atomic():
+            if options['disable_seqscan']:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            plans['with indexes'] = self.get_plans(query_shapes, options['analyze'])
+            if options['compare']:
+                with connection.schema_editor(atomic=False) as schema_editor:
+                    for index in UserQuizResult._meta.indexes:
+                        schema_editor.remove_index(UserQuizResult, index)
+                plans['without indexes'] = self.get_plans(query_shapes, options['analyze'])
+
+            transaction.set_rollback(True)
+
+        for name, _queryset in query_shapes:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, label_plans in plans.items():
+                self.stdout.write(self.style.MIGRATE_LABEL(f'  {label}:'))
+                self.stdout.write('\n'.join(f'    {line}' for line in label_plans[name].splitlines()))
+
+    @staticmethod
+    def get_plans(query_shapes, analyze):
+        return {name: queryset.explain(analyze=analyze) for name, queryset in query_shapes}
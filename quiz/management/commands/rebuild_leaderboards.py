@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from common.cache.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the global and company leaderboards from the latest completed quiz results'
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f'Global leaderboard and {rebuilt} company leaderboards rebuilt'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from services.analytics.rollups import rebuild_quiz_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily statistics of quizzes from their completed results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help='IDs of the quizzes to rebuild, all quizzes if empty')
+
+    def handle(self, *args, **options):
+        created = rebuild_quiz_daily_stats(options['quiz_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'{created} daily statistics rebuilt'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.models import Quiz
+from quiz.tasks import regrade_quiz_results_task
+from services.grading.regrade import REGRADE_BATCH_SIZE, regrade_quiz_results
+
+
+class Command(BaseCommand):
+    help = 'Regrade the completed results of quizzes with their current answer keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='+', type=int, help='IDs of the quizzes to regrade')
+        parser.add_argument('--batch-size', type=int, default=REGRADE_BATCH_SIZE,
+                            help='Number of results loaded and updated per batch')
+        parser.add_argument('--async', action='store_true', dest='run_async',
+                            help='Send the regrading to the Celery workers instead of running it here')
+
+    def handle(self, *args, **options):
+        quiz_ids = options['quiz_ids']
+        missing_quiz_ids = set(quiz_ids) - set(Quiz.objects.filter(id__in=quiz_ids).values_list('id', flat=True))
+        if missing_quiz_ids:
+            raise CommandError(f'Quizzes not found: {", ".join(map(str, sorted(missing_quiz_ids)))}')
+
+        for quiz_id in quiz_ids:
+            if options['run_async']:
+                regrade_quiz_results_task.delay(quiz_id, batch_size=options['batch_size'])
+                self.stdout.write(f'Quiz {quiz_id}: regrading task sent')
+                continue
+
+            summary = regrade_quiz_results(quiz_id, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Quiz {quiz_id}: {summary["regraded"]} results regraded, {summary["updated"]} updated, '
+                f'{summary["skipped"]} skipped'
+            ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-17 14:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_userquizresult'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userquizresult',
+            name='responses',
+            field=models.JSONField(blank=True, null=True, verbose_name='responses'),
+        ),
+    ]
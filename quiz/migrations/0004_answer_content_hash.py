@@ -0,0 +1,56 @@
+import hashlib
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def fill_answer_content_hashes(apps, schema_editor):
+    """
+    Set the content hashes of the existing answers and merge the duplicated answers into the oldest one.
+    """
+    Answer = apps.get_model('quiz', 'Answer')
+    QuestionAnswer = Answer.question.through
+
+    answer_ids_by_hash = defaultdict(list)
+    for answer_id, text, is_right in Answer.objects.order_by('id').values_list('id', 'text', 'is_right').iterator():
+        answer_ids_by_hash[hashlib.sha256(f'{int(is_right)}:{text}'.encode()).hexdigest()].append(answer_id)
+
+    replacements = {}
+    answers = []
+    for content_hash, answer_ids in answer_ids_by_hash.items():
+        answers.append(Answer(id=answer_ids[0], content_hash=content_hash))
+        replacements.update({duplicate_id: answer_ids[0] for duplicate_id in answer_ids[1:]})
+
+    if replacements:
+        links = set(QuestionAnswer.objects.exclude(answer_id__in=replacements).values_list('question_id', 'answer_id'))
+        moved_links = []
+        removed_link_ids = []
+        for link in QuestionAnswer.objects.filter(answer_id__in=replacements).order_by('id'):
+            link.answer_id = replacements[link.answer_id]
+            if (link.question_id, link.answer_id) in links:
+                removed_link_ids.append(link.id)
+            else:
+                links.add((link.question_id, link.answer_id))
+                moved_links.append(link)
+
+        QuestionAnswer.objects.filter(id__in=removed_link_ids).delete()
+        QuestionAnswer.objects.bulk_update(moved_links, fields=('answer_id',), batch_size=1000)
+        Answer.objects.filter(id__in=replacements).delete()
+
+    Answer.objects.bulk_update(answers, fields=('content_hash',), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_userquizresult_responses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True, verbose_name='content hash'),
+        ),
+        migrations.RunPython(fill_answer_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0004_answer_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='answer',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True, verbose_name='content hash'),
+        ),
+    ]
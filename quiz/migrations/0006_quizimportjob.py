@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-17 14:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import functools
+import services.get_file_path
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0003_companymember_admin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0005_alter_answer_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('file', models.FileField(blank=True, upload_to=functools.partial(services.get_file_path.get_path_with_unique_filename, *(), **{'file_path': 'files/quizzes'}), verbose_name='file')),
+                ('status', models.CharField(choices=[('PENDING', 'pending'), ('PROCESSING', 'processing'), ('COMPLETED', 'completed'), ('FAILED', 'failed')], default='pending', verbose_name='status')),
+                ('processed_sheets', models.PositiveIntegerField(default=0, verbose_name='processed sheets')),
+                ('errors', models.JSONField(blank=True, default=list, verbose_name='errors')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_import_jobs', to='company.company', verbose_name='company')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='quiz_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='created by')),
+                ('quizzes', models.ManyToManyField(blank=True, related_name='import_jobs', to='quiz.quiz', verbose_name='quizzes')),
+            ],
+            options={
+                'verbose_name': 'quiz import job',
+                'verbose_name_plural': 'quiz import jobs',
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-17 15:04
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0006_quizimportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField(verbose_name='date')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='attempts')),
+                ('score_sum', models.FloatField(default=0, verbose_name='score sum')),
+                ('quiz_time_sum', models.DurationField(default=datetime.timedelta(0), verbose_name='quiz time sum')),
+                ('score_histogram', models.JSONField(default=list, verbose_name='score histogram')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='quiz.quiz', verbose_name='quiz')),
+            ],
+            options={
+                'verbose_name': 'quiz daily stats',
+                'verbose_name_plural': 'quiz daily stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='quizdailystats',
+            constraint=models.UniqueConstraint(fields=('quiz', 'date'), name='unique_quiz_daily_stats'),
+        ),
+    ]
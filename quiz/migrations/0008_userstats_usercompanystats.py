@@ -0,0 +1,79 @@
+# Generated by Django 4.2.5 on 2026-10-17 15:31
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+
+
+def fill_user_stats(apps, schema_editor):
+    UserQuizResult = apps.get_model('quiz', 'UserQuizResult')
+    UserStats = apps.get_model('quiz', 'UserStats')
+    UserCompanyStats = apps.get_model('quiz', 'UserCompanyStats')
+
+    results = UserQuizResult.objects.filter(participant__isnull=False, progress_status='completed')
+    totals = {'completed_quizzes': Count('id'), 'correct_answers_sum': Sum('correct_answers'),
+              'total_questions_sum': Sum('total_questions')}
+
+    UserStats.objects.bulk_create(
+        UserStats(user_id=row['participant_id'], completed_quizzes=row['completed_quizzes'],
+                  correct_answers=row['correct_answers_sum'], total_questions=row['total_questions_sum'])
+        for row in results.values('participant_id').annotate(**totals).order_by()
+    )
+    UserCompanyStats.objects.bulk_create(
+        UserCompanyStats(user_id=row['participant_id'], company_id=row['company_id'],
+                         completed_quizzes=row['completed_quizzes'], correct_answers=row['correct_answers_sum'],
+                         total_questions=row['total_questions_sum'])
+        for row in results.filter(company__isnull=False).values('participant_id', 'company_id')
+        .annotate(**totals).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('company', '0003_companymember_admin'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0007_quizdailystats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_quizzes', models.PositiveIntegerField(default=0, verbose_name='completed quizzes')),
+                ('correct_answers', models.FloatField(default=0, verbose_name='correct answers')),
+                ('total_questions', models.PositiveIntegerField(default=0, verbose_name='total questions')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_stats', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'user stats',
+                'verbose_name_plural': 'user stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='UserCompanyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_quizzes', models.PositiveIntegerField(default=0, verbose_name='completed quizzes')),
+                ('correct_answers', models.FloatField(default=0, verbose_name='correct answers')),
+                ('total_questions', models.PositiveIntegerField(default=0, verbose_name='total questions')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='member_quiz_stats', to='company.company', verbose_name='company')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='company_quiz_stats', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'user company stats',
+                'verbose_name_plural': 'user company stats',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usercompanystats',
+            constraint=models.UniqueConstraint(fields=('user', 'company'), name='unique_user_company_stats'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-17 15:34
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # the indexes are built without locking the results table against writes
+    atomic = False
+
+    dependencies = [
+        ('quiz', '0008_userstats_usercompanystats'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='userquizresult',
+            index=models.Index(fields=['participant', 'quiz', 'progress_status', '-updated_at'], name='uqr_participant_quiz_status'),
+        ),
+        AddIndexConcurrently(
+            model_name='userquizresult',
+            index=models.Index(condition=models.Q(('progress_status', 'completed')), fields=['participant', '-updated_at'], name='uqr_completed_participant'),
+        ),
+        AddIndexConcurrently(
+            model_name='userquizresult',
+            index=models.Index(condition=models.Q(('progress_status', 'completed')), fields=['company', 'participant', '-updated_at'], name='uqr_completed_company'),
+        ),
+        AddIndexConcurrently(
+            model_name='userquizresult',
+            index=models.Index(condition=models.Q(('progress_status', 'completed')), fields=['quiz', '-updated_at'], name='uqr_completed_quiz'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-17 15:37
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicated_started_results(apps, schema_editor):
+    """
+    Keep only the first started result of a participant for a quiz.
+    """
+    UserQuizResult = apps.get_model('quiz', 'UserQuizResult')
+
+    started_results = UserQuizResult.objects.filter(participant__isnull=False, quiz__isnull=False,
+                                                    progress_status='started')
+    kept_ids = started_results.values('participant_id', 'quiz_id').annotate(first_id=Min('id')) \
+        .order_by().values('first_id')
+    started_results.exclude(id__in=kept_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_userquizresult_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicated_started_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='userquizresult',
+            constraint=models.UniqueConstraint(condition=models.Q(('progress_status', 'started')), fields=('participant', 'quiz'), name='unique_started_user_quiz_result'),
+        ),
+    ]
@@ -1,18 +1,52 @@
+import hashlib
 from decimal import Decimal
+from functools import partial
 
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
 
-from common.enums import QuizProgressStatus
+from common.cache.leaderboards import update_leaderboards
+from common.cache.quiz_answer_key import get_quiz_answer_key
+from common.enums import QuizImportStatus, QuizProgressStatus
 from common.models import TimeStampedModel
 from company.models import Company
+from services.analytics.rollups import (
+    SCORE_HISTOGRAM_BINS,
+    get_histogram_increment,
+    get_histogram_percentile,
+    get_score_bin,
+)
+from services.get_file_path import get_path_with_unique_filename
 
 User = get_user_model()
 
 
+def add_to_counters(model, lookup, increments, **initial_values):
+    """
+    Increment the counters of the row matching the lookup with a single UPDATE query,
+    the row is created with the initial values if it does not exist yet.
+    Args:
+        model (Model): The model of the counters.
+        lookup (dict): The unique lookup of the row.
+        increments (dict): Dictionary {field name: F() increment expression}.
+        **initial_values: The field values of a new row.
+    """
+    with transaction.atomic():
+        if model.objects.filter(**lookup).update(**increments):
+            return
+
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **initial_values)
+        except IntegrityError:
+            # the row has been created by a concurrent transaction meanwhile
+            model.objects.filter(**lookup).update(**increments)
+
+
 class Quiz(TimeStampedModel):
     company = models.ForeignKey(Company, verbose_name=_('company'), on_delete=models.CASCADE, related_name='quizzes')
     title = models.CharField(_('title'), max_length=255)
@@ -26,44 +60,16 @@ class Quiz(TimeStampedModel):
     def __str__(self):
         return self.title[:50]
 
-    def get_updated_or_created_question(self, question_data):
-        question_id = question_data.get('id', None)
-        question = self.questions.filter(id=question_id).first()
-        if question_id and question.question_text != question_data.get('question_text'):
-            question.question_text = question_data['question_text']
-            question.save()
-        elif not question_id:
-            question = Question.objects.create(quiz=self, question_text=question_data['question_text'])
-
-        return question
-
-    def remove_unused_questions(self, immutable_question_ids):
-        self.questions.exclude(id__in=immutable_question_ids).delete()
+    def get_answer_key(self):
+        return get_quiz_answer_key(self)
 
     def get_count_correct_answers(self, user_responses):
-        correct_count = 0
-
-        for quiz_question, user_question in zip(self.questions.all(), user_responses.get('questions'), strict=False):
-            total_answers = quiz_question.answers.count()
-            if total_answers != len(user_question.get('answers')) \
-                    or quiz_question.question_text != user_question.get('question_text'):
-                raise ValidationError(_('Question mismatch'))
+        return self.get_answer_key().get_count_correct_answers(user_responses)
 
-            correct_answer = 0
-            for quiz_answer, user_answer \
-                    in zip(quiz_question.answers.all(), user_question.get('answers'), strict=False):
-                if quiz_answer.text != user_answer.get('text'):
-                    raise ValidationError(_('Answer mismatch'))
-
-                if quiz_answer.is_right == user_answer.get('is_right'):
-                    correct_answer += 1
-                else:
-                    correct_answer -= 1
-
-            if correct_answer > 0:
-                correct_count += correct_answer/total_answers
-
-        return correct_count
+    @classmethod
+    def update_version(cls, quiz_ids):
+        # a new updated_at value invalidates the cached answer keys of the quizzes
+        cls.objects.filter(id__in=quiz_ids).update(updated_at=timezone.now())
 
 
 class Question(TimeStampedModel):
@@ -77,27 +83,12 @@ class Question(TimeStampedModel):
     def __str__(self):
         return f'id_{self.id}: {self.question_text[:30]}'
 
-    def update_answers(self, answers_data):
-        immutable_answers_ids = []
-        for answer_data in answers_data:
-            answer = self.answers.filter(**answer_data)
-            if answer.exists():
-                immutable_answers_ids.append(answer.first().id)
-
-        remove_answer = self.answers.exclude(id__in=immutable_answers_ids)
-        self.answers.remove(*remove_answer)
-
-        for answer in answers_data:
-            new_answer, create = Answer.objects.get_or_create(**answer)
-            self.answers.add(new_answer)
-
-        self.save()
-
 
 class Answer(models.Model):
     question = models.ManyToManyField(Question, verbose_name=_('question'), related_name='answers')
     text = models.CharField(_('text'), max_length=255)
     is_right = models.BooleanField(_('is right'), default=False)
+    content_hash = models.CharField(_('content hash'), max_length=64, unique=True, editable=False)
 
     class Meta:
         verbose_name = _('answer')
@@ -106,6 +97,54 @@ class Answer(models.Model):
     def __str__(self):
         return f'id_{self.id}: {self.text[:30]}'
 
+    def save(self, *args, **kwargs):
+        content_hash = self.get_content_hash(self.text, self.is_right)
+        # answers are shared between questions of different quizzes, so a changed answer is linked, not edited
+        if not self._state.adding and content_hash != self.content_hash:
+            raise ValidationError(_('An answer cannot be changed, link an answer with the new content instead'))
+        self.content_hash = content_hash
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def get_content_key(answer_data):
+        return answer_data['text'], bool(answer_data['is_right'])
+
+    @staticmethod
+    def get_content_hash(text, is_right):
+        return hashlib.sha256(f'{int(is_right)}:{text}'.encode()).hexdigest()
+
+    @classmethod
+    def get_ids_by_content(cls, answers_data):
+        """
+        Map answer payloads to answer IDs using the unique content hash index.
+        Only the missing answers are created, concurrently created answers are selected again.
+        Args:
+            answers_data (list): List of answer payloads with 'text' and 'is_right' keys.
+        Returns:
+            dict: Dictionary {(text, is_right): answer ID}.
+        """
+        # keys are kept in the payload order, so the new answers get increasing IDs in that order
+        content_hashes = {
+            content_key: cls.get_content_hash(*content_key)
+            for content_key in dict.fromkeys(cls.get_content_key(answer_data) for answer_data in answers_data)
+        }
+        if not content_hashes:
+            return {}
+
+        ids_by_hash = dict(cls.objects.filter(content_hash__in=content_hashes.values())
+                           .values_list('content_hash', 'id'))
+
+        missing_answers = [cls(text=text, is_right=is_right, content_hash=content_hash)
+                           for (text, is_right), content_hash in content_hashes.items()
+                           if content_hash not in ids_by_hash]
+        if missing_answers:
+            # IDs are not returned for ignored conflicts, so the created answers are selected by their hashes
+            cls.objects.bulk_create(missing_answers, ignore_conflicts=True)
+            ids_by_hash.update(cls.objects.filter(content_hash__in=[answer.content_hash for answer in missing_answers])
+                               .values_list('content_hash', 'id'))
+
+        return {content_key: ids_by_hash[content_hash] for content_key, content_hash in content_hashes.items()}
+
 
 class UserQuizResult(TimeStampedModel):
     participant = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name=_('participant'),
@@ -129,10 +168,39 @@ class UserQuizResult(TimeStampedModel):
     quiz_time = models.DurationField(_('quiz time'), default=timezone.timedelta())
     company_average_score = models.DecimalField(_('company average score'), default=0, max_digits=5, decimal_places=2)
     user_rating = models.DecimalField(_('user rating'), default=0, max_digits=5, decimal_places=2)
+    responses = models.JSONField(_('responses'), null=True, blank=True)
 
     class Meta:
         verbose_name = _('user quiz result')
         verbose_name_plural = _('user quiz results')
+        constraints = [
+            models.UniqueConstraint(fields=('participant', 'quiz'), name='unique_started_user_quiz_result',
+                                    condition=models.Q(progress_status=QuizProgressStatus.STARTED.value)),
+        ]
+        indexes = [
+            # the last result of a user for a quiz: frequency limit, quiz start and completion, available quizzes
+            models.Index(fields=('participant', 'quiz', 'progress_status', '-updated_at'),
+                         name='uqr_participant_quiz_status'),
+            # completed results of a user, of a user in a company and of a quiz by completion time
+            models.Index(fields=('participant', '-updated_at'), name='uqr_completed_participant',
+                         condition=models.Q(progress_status=QuizProgressStatus.COMPLETED.value)),
+            models.Index(fields=('company', 'participant', '-updated_at'), name='uqr_completed_company',
+                         condition=models.Q(progress_status=QuizProgressStatus.COMPLETED.value)),
+            models.Index(fields=('quiz', '-updated_at'), name='uqr_completed_quiz',
+                         condition=models.Q(progress_status=QuizProgressStatus.COMPLETED.value)),
+        ]
+
+    @classmethod
+    def start(cls, participant, quiz, company_id):
+        """
+        Start a quiz with a single INSERT ... ON CONFLICT DO NOTHING query,
+        a quiz already started by the participant is left unchanged.
+        """
+        cls.objects.bulk_create(
+            [cls(participant=participant, quiz=quiz, company_id=company_id,
+                 progress_status=QuizProgressStatus.STARTED.value)],
+            ignore_conflicts=True,
+        )
 
     def quiz_completed(self, user_responses):
         if self.progress_status != QuizProgressStatus.STARTED.value:
@@ -140,31 +208,40 @@ class UserQuizResult(TimeStampedModel):
         if not user_responses:
             raise ValidationError(_('Answer data is required'))
 
-        last_completed_result = self.get_last_user_quiz_result(
-            participant=self.participant, progress_status=QuizProgressStatus.COMPLETED.value)
-        last_company_completed_result = self.get_last_user_quiz_result(
-            participant=self.participant, company=self.company, progress_status=QuizProgressStatus.COMPLETED.value)
-
-        self.total_questions = self.quiz.questions.count()
-        self.correct_answers = self.quiz.get_count_correct_answers(user_responses)
+        answer_key = self.quiz.get_answer_key()
+        self.total_questions = answer_key.total_questions
+        self.correct_answers = answer_key.get_count_correct_answers(user_responses)
+        self.responses = answer_key.get_response_rows(user_responses)
         self.quiz_time = timezone.now() - self.created_at
 
-        self.update_property_without_save('correct_answers_collector', last_completed_result, self.correct_answers)
-        self.update_property_without_save('total_questions_collector', last_completed_result, self.total_questions)
-        self.update_property_without_save('correct_company_answers_collector', last_company_completed_result,
-                                          self.correct_answers)
-        self.update_property_without_save('total_company_questions_collector', last_company_completed_result,
-                                          self.total_questions)
+        # the locked result and stats rows serialize the concurrent completions of the participant
+        with transaction.atomic():
+            # a concurrent completion of the same result is detected once it has committed
+            locked_status = type(self).objects.select_for_update().filter(pk=self.pk) \
+                .values_list('progress_status', flat=True).first()
+            if locked_status != QuizProgressStatus.STARTED.value:
+                raise ValidationError(_('The quiz has already been completed'))
 
-        self.user_rating = self.get_user_rating()
-        self.company_average_score = self.get_company_average_score()
+            user_stats = UserStats.add_result(self, user_id=self.participant_id)
+            self.correct_answers_collector = user_stats.correct_answers
+            self.total_questions_collector = user_stats.total_questions
 
-        self.progress_status = QuizProgressStatus.COMPLETED.value
-        self.save()
+            company_stats = user_stats
+            if self.company_id is not None:
+                company_stats = UserCompanyStats.add_result(self, user_id=self.participant_id,
+                                                            company_id=self.company_id)
+            self.correct_company_answers_collector = company_stats.correct_answers
+            self.total_company_questions_collector = company_stats.total_questions
 
-    @staticmethod
-    def get_last_user_quiz_result(**kwargs):
-        return UserQuizResult.objects.filter(**kwargs).order_by('-updated_at').first()
+            self.user_rating = self.get_user_rating()
+            self.company_average_score = self.get_company_average_score()
+
+            self.progress_status = QuizProgressStatus.COMPLETED.value
+            self.save()
+
+            QuizDailyStats.add_result(self)
+
+        update_leaderboards(self)
 
     def get_user_rating(self):
         new_rating = self.user_rating
@@ -185,10 +262,132 @@ class UserQuizResult(TimeStampedModel):
 
         return new_company_average_score
 
-    def update_property_without_save(self, attribute_name, instance, value):
-        new_value = value
 
-        if instance:
-            new_value += getattr(instance, attribute_name)
+class BaseUserStats(TimeStampedModel):
+    completed_quizzes = models.PositiveIntegerField(_('completed quizzes'), default=0)
+    correct_answers = models.FloatField(_('correct answers'), default=0)
+    total_questions = models.PositiveIntegerField(_('total questions'), default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def rating(self):
+        if not self.total_questions:
+            return None
+        return Decimal((self.correct_answers / self.total_questions) * 100).quantize(Decimal('1.00'))
+
+    @classmethod
+    def add_result(cls, result, **lookup):
+        """
+        Add a completed quiz result to the running totals with a single UPDATE ... SET x = x + ... query,
+        the row is created by the first result. The stats row stays locked until the end of the transaction.
+        """
+        increments = {
+            'completed_quizzes': F('completed_quizzes') + 1,
+            'correct_answers': F('correct_answers') + result.correct_answers,
+            'total_questions': F('total_questions') + result.total_questions,
+            'updated_at': timezone.now(),
+        }
+
+        with transaction.atomic():
+            add_to_counters(cls, lookup, increments, completed_quizzes=1, correct_answers=result.correct_answers,
+                            total_questions=result.total_questions)
+
+            # the row updated in this transaction cannot be changed by other transactions until it ends
+            return cls.objects.get(**lookup)
+
+
+class UserStats(BaseUserStats):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, verbose_name=_('user'), related_name='quiz_stats')
+
+    class Meta:
+        verbose_name = _('user stats')
+        verbose_name_plural = _('user stats')
+
+
+class UserCompanyStats(BaseUserStats):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name=_('user'),
+                             related_name='company_quiz_stats')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_('company'),
+                                related_name='member_quiz_stats')
 
-        setattr(self, attribute_name, new_value)
+    class Meta:
+        verbose_name = _('user company stats')
+        verbose_name_plural = _('user company stats')
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'company'), name='unique_user_company_stats'),
+        ]
+
+
+class QuizDailyStats(TimeStampedModel):
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, verbose_name=_('quiz'), related_name='daily_stats')
+    date = models.DateField(_('date'))
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    score_sum = models.FloatField(_('score sum'), default=0)
+    quiz_time_sum = models.DurationField(_('quiz time sum'), default=timezone.timedelta())
+    score_histogram = models.JSONField(_('score histogram'), default=list)
+
+    class Meta:
+        verbose_name = _('quiz daily stats')
+        verbose_name_plural = _('quiz daily stats')
+        constraints = [
+            models.UniqueConstraint(fields=('quiz', 'date'), name='unique_quiz_daily_stats'),
+        ]
+
+    @property
+    def mean_score(self):
+        return round(self.score_sum / self.attempts, 2) if self.attempts else None
+
+    @property
+    def mean_quiz_time(self):
+        return self.quiz_time_sum / self.attempts if self.attempts else None
+
+    def get_score_percentile(self, percentile):
+        return get_histogram_percentile(self.score_histogram, percentile)
+
+    @classmethod
+    def add_result(cls, result):
+        """
+        Add a completed quiz result to the statistics of its quiz and completion day with a single UPDATE query,
+        the row is created by the first result of the day.
+        """
+        if not result.total_questions:
+            return
+
+        score = result.correct_answers / result.total_questions * 100
+        score_bin = get_score_bin(score)
+        increments = {
+            'attempts': F('attempts') + 1,
+            'score_sum': F('score_sum') + score,
+            'quiz_time_sum': F('quiz_time_sum') + result.quiz_time,
+            'score_histogram': get_histogram_increment('score_histogram', score_bin),
+            'updated_at': timezone.now(),
+        }
+        score_histogram = [0] * SCORE_HISTOGRAM_BINS
+        score_histogram[score_bin] = 1
+
+        add_to_counters(cls, {'quiz_id': result.quiz_id, 'date': timezone.localdate(result.updated_at)}, increments,
+                        attempts=1, score_sum=score, quiz_time_sum=result.quiz_time, score_histogram=score_histogram)
+
+
+class QuizImportJob(TimeStampedModel):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_('company'),
+                                related_name='quiz_import_jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name=_('created by'),
+                                   related_name='quiz_import_jobs')
+    file = models.FileField(_('file'), upload_to=partial(get_path_with_unique_filename, file_path='files/quizzes'),
+                            blank=True)
+    status = models.CharField(_('status'),
+                              choices=[(status.name, status.value) for status in QuizImportStatus],
+                              default=QuizImportStatus.PENDING.value)
+    processed_sheets = models.PositiveIntegerField(_('processed sheets'), default=0)
+    quizzes = models.ManyToManyField(Quiz, verbose_name=_('quizzes'), related_name='import_jobs', blank=True)
+    errors = models.JSONField(_('errors'), default=list, blank=True)
+
+    class Meta:
+        verbose_name = _('quiz import job')
+        verbose_name_plural = _('quiz import jobs')
+
+    def __str__(self):
+        return f'id_{self.id}: {self.status}'
@@ -1,20 +1,28 @@
-from collections import OrderedDict
-
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
-from rest_framework import fields, serializers
+from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from common.enums import QuizProgressStatus
+from common.serializers import ExpandableFieldsMixin
 from company.models import Company
-from company.serializers import CompanySerializer
-from helios_backend.settings import EXCEL_FILE_MAX_SIZE_MB, MIN_COUNT_ANSWERS, MIN_COUNT_QUESTIONS
-from services.parsers.converter import convert_file_to_data
-from user.serializers import UserSerializer
-
-from .models import Answer, Question, Quiz, UserQuizResult
+from company.serializers import COMPANY_PARTICIPANT_FIELDS, CompanyReferenceSerializer, CompanySerializer
+from helios_backend.settings import (
+    EXCEL_FILE_MAX_SIZE_MB,
+    MIN_COUNT_ANSWERS,
+    MIN_COUNT_QUESTIONS,
+    QUIZ_IMPORT_FILE_MAX_SIZE_MB,
+)
+from services.analytics.series import BUCKET_SIZES, SERIES_METRICS
+from services.analytics.user_analytics import load_user_analytics, preload_quiz_fields, preload_user_fields
+from services.parsers.converter import FILE_FORMAT_HANDLERS, convert_file_to_data
+from services.quiz_sync import sync_quiz_questions
+from user.serializers import NestedUserListSerializer, UserReferenceSerializer, UserSerializer, get_request_company_id
+
+from .models import Answer, Question, Quiz, QuizDailyStats, QuizImportJob, UserQuizResult
 
 User = get_user_model()
 
@@ -53,8 +61,24 @@ class QuizSerializer(serializers.ModelSerializer):
         model = Quiz
         fields = '__all__'
 
+    @staticmethod
+    def preload_instances(quizzes, context):
+        """
+        Preload the method fields of a page of quizzes, of their companies and of the company owners.
+        Args:
+            quizzes (list): The quizzes to preload.
+            context (dict): The serializer context.
+        """
+        request = context.get('request') if context else None
+        prefetch_related_objects(quizzes, 'company__owner')
+        preload_quiz_fields(quizzes, request.user if request else None)
+        preload_user_fields([quiz.company.owner for quiz in quizzes], get_request_company_id(context))
+
     @staticmethod
     def get_last_quiz_completion_time(quiz):
+        if hasattr(quiz, 'preloaded_last_quiz_completion_time'):
+            return quiz.preloaded_last_quiz_completion_time
+
         last_user_quiz_result = quiz.quiz_result.filter(
             progress_status=QuizProgressStatus.COMPLETED.value
         )
@@ -65,6 +89,9 @@ class QuizSerializer(serializers.ModelSerializer):
         return last_user_quiz_result.order_by('updated_at').last().updated_at
 
     def get_auth_user_last_completed(self, quiz):
+        if hasattr(quiz, 'preloaded_auth_user_last_completed'):
+            return quiz.preloaded_auth_user_last_completed
+
         auth_user = self.context['request'].user
         if not auth_user:
             return None
@@ -99,7 +126,8 @@ class QuizDetailSerializer(QuizSerializer):
         pass
 
     def to_internal_value(self, data, is_file=True):
-        if self.context['request'].query_params.get('export_file') and is_file:
+        request = self.context.get('request')
+        if request and request.query_params.get('export_file') and is_file:
             file = data.get('file', None)
             if not file:
                 raise serializers.ValidationError({'message': _('File not found')})
@@ -110,18 +138,53 @@ class QuizDetailSerializer(QuizSerializer):
 
             quiz_list_data = convert_file_to_data(file)
             if self.context['view'].action == 'create':
-                validated_quiz_list_data = OrderedDict()
-                for index, validated_quiz_data \
-                        in enumerate(self.to_internal_value(data, is_file=False) for data in quiz_list_data):
-                    fields.set_value(validated_quiz_list_data, f'{index}', validated_quiz_data)
-                return validated_quiz_list_data
+                # the sheets are validated lazily, so every sheet is validated and inserted before the next is read,
+                # the errors of the sheets are raised from save() and the quizzes can be consumed only once
+                return {'quizzes': self.validate_quiz_sheets(quiz_list_data)}
             if self.context['view'].action == 'partial_update':
-                return super().to_internal_value(quiz_list_data[0])
+                quiz_data = next(quiz_list_data, None)
+                if quiz_data is None:
+                    raise serializers.ValidationError({'message': _('File is empty')})
+                return super().to_internal_value(quiz_data)
 
             raise serializers.ValidationError({'message': _('Action not supported')})
 
         return super().to_internal_value(data)
 
+    def validate_quiz_sheets(self, quiz_list_data):
+        """
+        Validate the sheets of a quiz file one by one while they are parsed.
+        Args:
+            quiz_list_data (iterator): Iterator of the quiz data of the sheets.
+        Yields:
+            dict: The validated quiz data of each sheet.
+        Raises:
+            ValidationError: The errors of the first invalid sheet under its 'sheet_<number>' key.
+        """
+        sheet_number = 1
+        while True:
+            try:
+                quiz_data = next(quiz_list_data, None)
+                if quiz_data is None:
+                    return
+                validated_data = self.to_internal_value(quiz_data, is_file=False)
+            except ValidationError as error:
+                raise ValidationError({f'sheet_{sheet_number}': error.detail}) from error
+
+            yield validated_data
+            sheet_number += 1
+
+    def to_representation(self, instance):
+        if isinstance(instance, Quiz):
+            # load the questions and answers of the quiz with two queries instead of one query per question
+            prefetch_related_objects(
+                [instance],
+                Prefetch('questions', queryset=Question.objects.order_by('id')),
+                Prefetch('questions__answers', queryset=Answer.objects.order_by('id')),
+            )
+
+        return super().to_representation(instance)
+
     def create(self, validated_data):
         is_export_file = self.context['request'].query_params.get('export_file')
         is_create = self.context['view'].action == 'create'
@@ -131,8 +194,8 @@ class QuizDetailSerializer(QuizSerializer):
         with transaction.atomic():
             quizzes = []
             if is_export_file and is_create:
-                for quiz_key in validated_data:
-                    quizzes.append(self.create_quiz(company, validated_data[quiz_key]))
+                for quiz_data in validated_data['quizzes']:
+                    quizzes.append(self.create_quiz(company, quiz_data))
             else:
                 quizzes.append(self.create_quiz(company, validated_data))
 
@@ -145,14 +208,7 @@ class QuizDetailSerializer(QuizSerializer):
             instance.frequency = validated_data.get('frequency', instance.frequency)
             questions_data = validated_data.pop('questions')
 
-            immutable_question_ids = []
-            for question_data in questions_data:
-                question = instance.questions.filter(id=question_data.get('id'), quiz=instance)
-                if question.exists():
-                    immutable_question_ids.append(question.first().id)
-            instance.remove_unused_questions(immutable_question_ids)
-
-            self.create_or_update_questions(instance, questions_data)
+            sync_quiz_questions(instance, questions_data)
             instance.save()
 
             return instance
@@ -161,19 +217,9 @@ class QuizDetailSerializer(QuizSerializer):
         validated_data['company'] = company
         questions_data = validated_data.pop('questions')
         quiz = Quiz.objects.create(**validated_data)
-        self.create_or_update_questions(quiz, questions_data)
+        sync_quiz_questions(quiz, questions_data, created=True)
         return quiz
 
-    @staticmethod
-    def create_or_update_questions(quiz, questions_data):
-        # add or change questions
-        for question_data in questions_data:
-            question = quiz.get_updated_or_created_question(question_data)
-
-            # add or change answers
-            answers_data = question_data.pop('answers')
-            question.update_answers(answers_data)
-
     @staticmethod
     def validate_questions(questions_data):
         if len(questions_data) < MIN_COUNT_QUESTIONS:
@@ -192,40 +238,147 @@ class QuizDetailSerializer(QuizSerializer):
         return questions_data
 
 
+# the fields of the quiz payload that depend on the requesting user or change with every completion
+QUIZ_PARTICIPANT_FIELDS = ('last_quiz_completion_time', 'auth_user_last_completed')
+
+
+class QuizContentSerializer(QuizDetailSerializer):
+    """
+    The part of the detailed quiz payload that is the same for all participants with the same access level.
+    The company without its participant fields is the last field, so they can be appended to the rendered JSON.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        for field_name in QUIZ_PARTICIPANT_FIELDS:
+            fields.pop(field_name)
+        return fields
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field_name in QUIZ_PARTICIPANT_FIELDS:
+            data.pop(field_name, None)
+
+        company = data.pop('company')
+        for field_name in COMPANY_PARTICIPANT_FIELDS:
+            company.pop(field_name, None)
+        data['company'] = company
+        return data
+
+
+class QuizParticipantFieldsSerializer(QuizSerializer):
+    """
+    The part of the detailed quiz payload that depends on the requesting user.
+    """
+    class Meta(QuizSerializer.Meta):
+        fields = QUIZ_PARTICIPANT_FIELDS
+
+
+class QuizImportJobSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True)
+
+    class Meta:
+        model = QuizImportJob
+        fields = ('id', 'company', 'created_by', 'file', 'status', 'processed_sheets', 'quizzes', 'errors',
+                  'created_at', 'updated_at')
+        read_only_fields = ('company', 'created_by', 'status', 'processed_sheets', 'quizzes', 'errors')
+
+    @staticmethod
+    def validate_file(file):
+        if not FILE_FORMAT_HANDLERS.get(file.name.strip().split('.')[-1]):
+            raise serializers.ValidationError(_('This format is not supported.'))
+        if file.size > (QUIZ_IMPORT_FILE_MAX_SIZE_MB * 1024 * 1024):
+            raise serializers.ValidationError(
+                _('Maximum file size allowed is {} Mb').format(QUIZ_IMPORT_FILE_MAX_SIZE_MB)
+            )
+
+        return file
+
+
 class UserQuizResultSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserQuizResult
         fields = '__all__'
 
 
-class UserQuizResultDetailSerializer(UserQuizResultSerializer):
-    participant = UserSerializer(read_only=True)
-    company = CompanySerializer(read_only=True)
-    quiz = QuizSerializer(read_only=True)
+class QuizReferenceSerializer(serializers.ModelSerializer):
+    """
+    Reference to a quiz nested in other objects, the full quiz is serialized with ?expand=quiz.
+    """
+    class Meta:
+        model = Quiz
+        fields = ('id', 'title')
+
+
+class UserQuizResultDetailSerializer(ExpandableFieldsMixin, UserQuizResultSerializer):
+    participant = UserReferenceSerializer(read_only=True)
+    company = CompanyReferenceSerializer(read_only=True)
+    quiz = QuizReferenceSerializer(read_only=True)
+    expanded_fields = {'participant': UserSerializer, 'company': CompanySerializer, 'quiz': QuizSerializer}
 
     class Meta(UserQuizResultSerializer.Meta):
-        pass
+        list_serializer_class = NestedUserListSerializer
+        user_field = 'participant'
+
+
+class AnalyticsSeriesParamsSerializer(serializers.Serializer):
+    metric = serializers.ChoiceField(choices=SERIES_METRICS)
+    bucket = serializers.ChoiceField(choices=BUCKET_SIZES, default='day')
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError({'date_to': _('The end date must not be earlier than the start date.')})
+
+        return data
+
+
+class LeaderboardParamsSerializer(serializers.Serializer):
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    user_id = serializers.IntegerField(required=False)
+    neighbours = serializers.IntegerField(min_value=0, max_value=10, default=2)
+
+
+class QuizDailyStatsSerializer(serializers.ModelSerializer):
+    mean_score = serializers.FloatField(read_only=True)
+    median_score = serializers.SerializerMethodField(read_only=True)
+    p90_score = serializers.SerializerMethodField(read_only=True)
+    mean_quiz_time = serializers.DurationField(read_only=True)
+
+    class Meta:
+        model = QuizDailyStats
+        fields = ('date', 'attempts', 'mean_score', 'median_score', 'p90_score', 'mean_quiz_time', 'score_histogram')
+
+    @staticmethod
+    def get_median_score(stats):
+        return stats.get_score_percentile(50)
+
+    @staticmethod
+    def get_p90_score(stats):
+        return stats.get_score_percentile(90)
 
 
 class QuizAnalyticsSerializer(serializers.ModelSerializer):
-    quiz_results = serializers.SerializerMethodField(read_only=True)
+    daily_stats = QuizDailyStatsSerializer(many=True, read_only=True)
 
     class Meta:
         model = Quiz
-        fields = ('id', 'title', 'quiz_results')
+        fields = ('id', 'title', 'daily_stats')
 
-    @staticmethod
-    def get_quiz_results(quiz):
-        queryset = UserQuizResult.objects.filter(
-            quiz=quiz,
-            progress_status=QuizProgressStatus.COMPLETED.value,
-        ).order_by('updated_at')
 
-        serialized_results = UserQuizResultSerializer(queryset, many=True)
-        return serialized_results.data
+class UserAnalyticsListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        users = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        load_user_analytics(users, request.user if request else None)
+        return super().to_representation(users)
 
 
 class UserAnalyticsSerializer(serializers.ModelSerializer):
+    """
+    Analytics of users with their completed results, companies and quizzes.
+    The relations of all serialized users are loaded by load_user_analytics with a fixed number of queries.
+    """
     quiz_results = serializers.SerializerMethodField(read_only=True)
     companies = serializers.SerializerMethodField(read_only=True)
     quizzes = serializers.SerializerMethodField(read_only=True)
@@ -233,28 +386,23 @@ class UserAnalyticsSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'quiz_results', 'companies', 'quizzes')
+        list_serializer_class = UserAnalyticsListSerializer
+
+    def to_representation(self, instance):
+        if not hasattr(instance, 'preloaded_quiz_results'):
+            request = self.context.get('request')
+            load_user_analytics([instance], request.user if request else None)
+        return super().to_representation(instance)
 
     @staticmethod
     def get_quiz_results(user):
-        queryset = UserQuizResult.objects.filter(
-            participant=user,
-            progress_status=QuizProgressStatus.COMPLETED.value,
-        ).order_by('updated_at')
-
-        serialized_results = UserQuizResultSerializer(queryset, many=True)
-        return serialized_results.data
+        return UserQuizResultSerializer(user.preloaded_quiz_results, many=True).data
 
     def get_companies(self, user):
-        queryset = Company.objects.filter(companymember__member=user)
-
-        serialized_results = CompanySerializer(queryset, many=True, context=self.context)
-        return serialized_results.data
+        return CompanySerializer(user.preloaded_companies, many=True, context=self.context).data
 
     def get_quizzes(self, user):
-        queryset = Quiz.objects.filter(quiz_result__participant=user).distinct()
-
-        serialized_results = QuizSerializer(queryset, many=True, context=self.context)
-        return serialized_results.data
+        return QuizSerializer(user.preloaded_quizzes, many=True, context=self.context).data
 
 
 class CompanyAnalyticsSerializer(serializers.ModelSerializer):
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Answer, Question, Quiz
+
+quiz_version_signals_suspended = ContextVar('quiz_version_signals_suspended', default=False)
+
+
+@contextmanager
+def suspend_quiz_version_signals():
+    """
+    Disable the per-row quiz version updates, the caller must update the quiz version itself.
+    """
+    token = quiz_version_signals_suspended.set(True)
+    try:
+        yield
+    finally:
+        quiz_version_signals_suspended.reset(token)
+
+
+# any change of questions or answers creates a new quiz version and invalidates its cached answer key
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def update_quiz_version_on_question_change(sender, instance, **kwargs):
+    if not quiz_version_signals_suspended.get():
+        Quiz.update_version([instance.quiz_id])
+
+
+@receiver(post_save, sender=Answer)
+@receiver(pre_delete, sender=Answer)
+def update_quiz_version_on_answer_change(sender, instance, created=False, **kwargs):
+    if not created and not quiz_version_signals_suspended.get():
+        Quiz.update_version(instance.question.values_list('quiz_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Answer.question.through)
+def update_quiz_version_on_answers_set_change(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear') or quiz_version_signals_suspended.get():
+        return
+
+    if isinstance(instance, Question):
+        Quiz.update_version([instance.quiz_id])
+    elif pk_set:
+        Quiz.update_version(Question.objects.filter(id__in=pk_set).values_list('quiz_id', flat=True))
+    else:
+        Quiz.update_version(instance.question.values_list('quiz_id', flat=True))
@@ -0,0 +1,19 @@
+from helios_backend.celery import app
+from services.grading.regrade import REGRADE_BATCH_SIZE, regrade_quiz_results
+from services.quiz_import import import_quizzes
+
+
+@app.task
+def regrade_quiz_results_task(quiz_id, batch_size=REGRADE_BATCH_SIZE):
+    """
+    The task is to regrade all completed results of a quiz after its answer key was corrected.
+    """
+    return regrade_quiz_results(quiz_id, batch_size=batch_size)
+
+
+@app.task
+def import_quizzes_task(job_id):
+    """
+    The task is to import the quizzes of an uploaded file in chunked transactions.
+    """
+    import_quizzes(job_id)
@@ -1,12 +1,28 @@
+import csv
+import json
 from decimal import Decimal
+from io import BytesIO, StringIO
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from openpyxl import Workbook, load_workbook
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIClient
 
-from common.enums import QuizProgressStatus
+from common.cache.client import get_redis_client
+from common.cache.leaderboards import GLOBAL_LEADERBOARD_KEY
+from common.cache.question_stats import add_quiz_response_counters, get_question_stats_redis_key
+from common.enums import QuizImportStatus, QuizProgressStatus
+from services.analytics.rollups import rebuild_user_stats
+from services.quiz_import import import_quizzes
 from tests.test_data import (
     CREATE_QUIZ_DATA,
     CREATE_QUIZ_VS_ANSWER_DATA,
@@ -29,7 +45,7 @@ from tests.test_models import (
     UserQuizResultFactory,
 )
 
-from .models import Quiz, UserQuizResult
+from .models import Answer, Quiz, QuizDailyStats, QuizImportJob, UserCompanyStats, UserQuizResult, UserStats
 
 User = get_user_model()
 
@@ -102,31 +118,82 @@ class QuizTests(TestCase):
     def test_quizzes_analytics_list(self):
         self.client.force_authenticate(user=self.user_3)
         url = reverse('quiz-analytics-list')
+        call_command('rebuild_quiz_stats', stdout=StringIO())
 
         response = self.client.get(url)
         data = response.data
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(data), Quiz.objects.count())
-        expected_results = [self.result_3_2.id, self.result_3_3.id]
-        results_from_response = [result['quiz_results'] for result in data if result['id'] == self.quiz_3.id]
-        results_id = [result['id'] for result in results_from_response[0]]
-        self.assertEqual(sorted(results_id), sorted(expected_results))
+        expected_results = [self.result_3_2, self.result_3_3]
+        daily_stats = [quiz['daily_stats'] for quiz in data if quiz['id'] == self.quiz_3.id][0]
+        self.assertEqual(sum(stats['attempts'] for stats in daily_stats), len(expected_results))
+        self.assertAlmostEqual(
+            sum(stats['mean_score'] * stats['attempts'] for stats in daily_stats),
+            sum(result.correct_answers / result.total_questions * 100 for result in expected_results),
+            places=1,
+        )
 
     def test_users_analytics_list(self):
         self.client.force_authenticate(user=self.user_3)
         url = reverse('user-analytics-list')
 
         response = self.client.get(url)
-        data = response.data
+        data = response.data['results']
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], User.objects.count())
         self.assertEqual(len(data), User.objects.count())
         expected_results = [self.result_1_3.id, self.result_2_3.id, self.result_3_3.id]
         results_from_response = [result['quiz_results'] for result in data if result['id'] == self.user_3.id]
         results_id = [result['id'] for result in results_from_response[0]]
         self.assertEqual(sorted(results_id), sorted(expected_results))
 
+        user_3_data = [user for user in data if user['id'] == self.user_3.id][0]
+        self.assertEqual([company['id'] for company in user_3_data['companies']], [self.company_1.id])
+        self.assertTrue(user_3_data['companies'][0]['is_admin'])
+        self.assertEqual(user_3_data['companies'][0]['owner']['rating'], None)
+        self.assertEqual([quiz['id'] for quiz in user_3_data['quizzes']],
+                         sorted([self.quiz_1.id, self.quiz_2.id, self.quiz_3.id]))
+        self.assertEqual(user_3_data['quizzes'][0]['auth_user_last_completed']['completed'], True)
+
+    def test_users_analytics_list_query_count(self):
+        self.client.force_authenticate(user=self.user_3)
+        url = reverse('user-analytics-list')
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        queries_count = len(queries)
+
+        for _ in range(3):
+            user = UserFactory()
+            company = CompanyFactory(owner=UserFactory())
+            CompanyMemberAdminFactory(member=user, company=company)
+            for quiz in (QuizFactory(company=company), self.quiz_1):
+                UserQuizResultCompletionFactory(participant=user, company=quiz.company, quiz=quiz)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), User.objects.count())
+        self.assertLessEqual(len(queries), queries_count)
+
+    def test_company_roles_loaded_once_per_request(self):
+        self.client.force_authenticate(user=self.user_3)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url_get_quiz_list)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any(quiz['last_quiz_completion_time'] for quiz in response.data['results']))
+        self.assertEqual(len([query for query in queries if 'company_companymember' in query['sql']]), 1)
+
+        response = self.client.get(reverse('company-leaderboard', args=[self.company_1.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('company-leaderboard', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_user_analytics_detail(self):
         self.client.force_authenticate(user=self.user_3)
         url = reverse('user-analytics-detail', args=[self.user_3.id])
@@ -303,7 +370,7 @@ class QuizTests(TestCase):
 
         self.assertEqual(start_response.status_code, status.HTTP_200_OK)
         self.assertEqual(UserQuizResult.objects.first().progress_status, QuizProgressStatus.STARTED.value)
-        self.assertNotIsInstance(start_response.data['questions'][0]['answers'][0]['is_right'], bool)
+        self.assertNotIsInstance(start_response.json()['questions'][0]['answers'][0]['is_right'], bool)
 
         # let's try to re-create duplicate UserQuizResult
         self.client.post(url_quiz_start, format='json')
@@ -348,3 +415,656 @@ class QuizTests(TestCase):
                          Decimal(100 * (5 / 7 + 0.5 + 1 + 2) / (3 + 2)).quantize(Decimal('1.00')))
         self.assertEqual(Decimal(data_3['company_average_score']),
                          Decimal(100 * (5 / 7 + 0.5 + 1 + 2) / (3 + 2)).quantize(Decimal('1.00')))
+
+        user_stats = UserStats.objects.get(user=self.user_4)
+        self.assertEqual(user_stats.completed_quizzes, 2)
+        self.assertEqual(user_stats.total_questions, 3 + 2)
+        self.assertEqual(user_stats.rating, Decimal(data_3['user_rating']))
+        company_stats = UserCompanyStats.objects.get(user=self.user_4, company=self.company_1)
+        self.assertEqual((company_stats.completed_quizzes, company_stats.total_questions), (2, 3 + 2))
+
+        # the totals rebuilt from the results match the incremental ones
+        rebuild_user_stats([self.user_4.id])
+        self.assertEqual(UserStats.objects.get(user=self.user_4).rating, user_stats.rating)
+
+    def test_quiz_start_single_started_result(self):
+        UserQuizResult.objects.filter(participant=self.user_3, quiz=self.quiz_1).delete()
+
+        with self.assertNumQueries(1):
+            UserQuizResult.start(self.user_3, self.quiz_1, self.company_1.id)
+        UserQuizResult.start(self.user_3, self.quiz_1, self.company_1.id)
+        self.assertEqual(UserQuizResult.objects.filter(participant=self.user_3, quiz=self.quiz_1).count(), 1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserQuizResultFactory(participant=self.user_3, company=self.company_1, quiz=self.quiz_1)
+
+    def test_complete_quiz_result_twice(self):
+        self.client.force_authenticate(user=self.user_1)
+        response = self.client.post(self.url_get_quiz_list, self.create_quiz_data_2, format='json')
+        quiz_id = response.data['quizzes'][0]['id']
+        self.client.force_authenticate(user=self.user_2)
+        self.client.post(reverse('quiz-start', args=[self.company_1.id, quiz_id]), format='json')
+
+        # two handles of the same started result, as loaded by two concurrent requests
+        result = UserQuizResult.objects.get(participant=self.user_2, quiz_id=quiz_id)
+        stale_result = UserQuizResult.objects.get(pk=result.pk)
+        result.quiz_completed(self.quiz_complete_data_2)
+
+        with self.assertRaises(ValidationError):
+            stale_result.quiz_completed(self.quiz_complete_data_2)
+        self.assertEqual(UserStats.objects.get(user=self.user_2).completed_quizzes, 1)
+        self.assertEqual(UserCompanyStats.objects.get(user=self.user_2, company=self.company_1).completed_quizzes, 1)
+        self.assertEqual(QuizDailyStats.objects.get(quiz_id=quiz_id).attempts, 1)
+
+    def test_quiz_start_cached_payload(self):
+        url_quiz_start = reverse('quiz-start', args=[self.company_1.id, self.quiz_1.id])
+        self.client.force_authenticate(user=self.user_4)
+        payload = self.client.post(url_quiz_start, format='json').json()
+
+        self.assertEqual(payload['id'], self.quiz_1.id)
+        self.assertEqual(payload['company']['id'], self.company_1.id)
+        self.assertEqual(payload['company']['owner']['id'], self.user_1.id)
+        self.assertFalse(payload['company']['is_member'])
+        self.assertFalse(payload['company']['is_active_request'])
+        self.assertFalse(payload['auth_user_last_completed']['completed'])
+        self.assertIsNone(payload['last_quiz_completion_time'])
+        self.assertEqual([question['id'] for question in payload['questions']],
+                         sorted([self.question_1_1.id, self.question_1_2.id, self.question_1_3.id]))
+        self.assertTrue(all(answer['is_right'] is None
+                            for question in payload['questions'] for answer in question['answers']))
+
+        # the quiz content and the company owner of another participant are served from the cache
+        self.client.force_authenticate(user=UserFactory())
+        with CaptureQueriesContext(connection) as queries:
+            other_payload = self.client.post(url_quiz_start, format='json').json()
+        self.assertEqual(other_payload['questions'], payload['questions'])
+        self.assertEqual(other_payload['company'], payload['company'])
+        self.assertFalse(any('quiz_question' in query['sql'] or 'quiz_userstats' in query['sql'] for query in queries))
+
+        # the company flags are rendered for the requesting user
+        admin = CompanyMemberAdminFactory(member=UserFactory(), company=self.company_1).member
+        self.client.force_authenticate(user=admin)
+        self.assertTrue(self.client.post(url_quiz_start, format='json').json()['company']['is_admin'])
+
+        # a quiz edit creates a new version of the content
+        self.quiz_1.title = 'New title'
+        self.quiz_1.save()
+        self.client.force_authenticate(user=UserFactory())
+        self.assertEqual(self.client.post(url_quiz_start, format='json').json()['title'], 'New title')
+
+    def test_answer_key_grading_without_queries(self):
+        answer_key = self.quiz_1.get_answer_key()
+        user_responses = {
+            'questions': [
+                {
+                    'question_text': answer_key.question_texts[index],
+                    'answers': [{'text': answer_key.answer_texts[answer_index],
+                                 'is_right': answer_key.answer_is_right[answer_index]}
+                                for answer_index in answer_key.get_answer_range(index)],
+                }
+                for index in range(answer_key.total_questions)
+            ]
+        }
+
+        with self.assertNumQueries(0):
+            correct_answers = self.quiz_1.get_count_correct_answers(user_responses)
+
+        self.assertEqual(answer_key.total_questions, 3)
+        self.assertEqual(correct_answers, 3)
+
+    def test_answer_key_invalidated_on_quiz_update(self):
+        self.client.force_authenticate(user=self.user_1)
+        answer_key = self.quiz_3.get_answer_key()
+
+        self.client.patch(self.url_get_quiz_3, self.updated_quiz_data, format='json')
+        self.quiz_3.refresh_from_db()
+        updated_answer_key = self.quiz_3.get_answer_key()
+
+        self.assertNotEqual(answer_key.version, updated_answer_key.version)
+        self.assertEqual(updated_answer_key.question_texts,
+                         tuple(question['question_text'] for question in self.updated_quiz_data['questions']))
+
+    def test_regrade_quiz_results(self):
+        UserQuizResult.objects.all().delete()
+        self.client.force_authenticate(user=self.user_1)
+        quiz_id_3 = self.client.post(self.url_get_quiz_list, self.create_quiz_data_3, format='json') \
+            .data['quizzes'][0]['id']
+        quiz_id_2 = self.client.post(self.url_get_quiz_list, self.create_quiz_data_2, format='json') \
+            .data['quizzes'][0]['id']
+
+        self.client.force_authenticate(user=self.user_4)
+        for quiz_id, user_responses in ((quiz_id_3, self.create_quiz_data_3), (quiz_id_2, self.quiz_complete_data_2)):
+            self.client.post(reverse('quiz-start', args=[self.company_1.id, quiz_id]), format='json')
+            self.client.post(reverse('quiz-complete', args=[self.company_1.id, quiz_id]), user_responses,
+                             format='json')
+
+        # the answer key of the first quiz is corrected the same way as a quiz edit
+        self.client.force_authenticate(user=self.user_1)
+        url_quiz_3 = reverse('quiz-detail', args=[self.company_1.id, quiz_id_3])
+        quiz_data = self.client.get(url_quiz_3).data
+        for answer_data in quiz_data['questions'][0]['answers']:
+            if answer_data['text'] == 'Answer 11':
+                answer_data['is_right'] = True
+        self.assertEqual(self.client.patch(url_quiz_3, quiz_data, format='json').status_code, status.HTTP_200_OK)
+        # the answer shared with other quizzes is relinked, not edited in place
+        self.assertTrue(Answer.objects.filter(text='Answer 11', is_right=False).exists())
+
+        url_company_statistics = reverse('company-statistics-detail', args=[self.company_1.id])
+        url_quiz_statistics = reverse('quiz-statistics', args=[self.company_1.id, quiz_id_3])
+        company_score = self.client.get(url_company_statistics).data['score']
+        self.assertEqual(self.client.get(url_quiz_statistics).data['score']['mean'], 100)
+
+        call_command('regrade_quiz_results', quiz_id_3, stdout=StringIO())
+
+        # the cached statistics are not served for the regraded results
+        self.assertNotEqual(self.client.get(url_company_statistics).data['score'], company_score)
+        self.assertEqual(self.client.get(url_quiz_statistics).data['score']['mean'], 50)
+
+        first_result = UserQuizResult.objects.get(quiz_id=quiz_id_3)
+        last_result = UserQuizResult.objects.get(quiz_id=quiz_id_2)
+        self.assertEqual(first_result.correct_answers, 1)
+        self.assertEqual(first_result.correct_answers_collector, 1)
+        self.assertEqual(first_result.user_rating, Decimal('50.00'))
+        self.assertAlmostEqual(last_result.correct_answers_collector, 1 + 5/7 + 0.5 + 1)
+        self.assertAlmostEqual(last_result.correct_company_answers_collector, 1 + 5/7 + 0.5 + 1)
+        self.assertEqual(last_result.user_rating, Decimal(100 * (1 + 5/7 + 0.5 + 1) / 5).quantize(Decimal('1.00')))
+
+        # the running totals of the participant follow the regraded results
+        user_stats = UserStats.objects.get(user=self.user_4)
+        self.assertAlmostEqual(user_stats.correct_answers, last_result.correct_answers_collector)
+        self.assertEqual(user_stats.rating, last_result.user_rating)
+        self.assertAlmostEqual(UserCompanyStats.objects.get(user=self.user_4, company=self.company_1).correct_answers,
+                               last_result.correct_company_answers_collector)
+
+    def test_quiz_and_company_statistics(self):
+        self.client.force_authenticate(user=self.user_1)
+        quiz_id = self.client.post(self.url_get_quiz_list, self.create_quiz_data_3, format='json') \
+            .data['quizzes'][0]['id']
+        wrong_responses = {'questions': [
+            {**question, 'answers': [{**answer, 'is_right': not answer['is_right']} for answer in question['answers']]}
+            for question in self.create_quiz_data_3['questions']
+        ]}
+
+        for user, user_responses in ((self.user_4, self.create_quiz_data_3), (self.user_2, wrong_responses)):
+            self.client.force_authenticate(user=user)
+            self.client.post(reverse('quiz-start', args=[self.company_1.id, quiz_id]), format='json')
+            self.client.post(reverse('quiz-complete', args=[self.company_1.id, quiz_id]), user_responses,
+                             format='json')
+
+        url = reverse('quiz-statistics', args=[self.company_1.id, quiz_id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.user_3)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['score']['count'], 2)
+        self.assertEqual(response.data['score']['percentiles']['p50'], 50)
+        self.assertEqual(response.data['score']['histogram']['counts'][0], 1)
+        self.assertEqual(response.data['score']['histogram']['counts'][-1], 1)
+        self.assertEqual([question['attempts'] for question in response.data['questions']], [2, 2])
+        self.assertEqual([question['difficulty'] for question in response.data['questions']], [50, 50])
+
+        # the cached statistics are served with the single state query
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).data, response.data)
+        self.assertFalse(any('responses' in query['sql'] for query in queries))
+
+        response = self.client.get(reverse('company-statistics-detail', args=[self.company_1.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quiz_time']['count'], UserQuizResult.objects.filter(
+            company=self.company_1, progress_status=QuizProgressStatus.COMPLETED.value).count())
+
+        self.client.force_authenticate(user=self.user_4)
+        response = self.client.get(reverse('company-statistics-detail', args=[self.company_1.id]))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_quiz_question_statistics_counters(self):
+        self.client.force_authenticate(user=self.user_1)
+        quiz_id = self.client.post(self.url_get_quiz_list, self.create_quiz_data_3, format='json') \
+            .data['quizzes'][0]['id']
+        url = reverse('quiz-question-statistics', args=[self.company_1.id, quiz_id])
+        # the counters of the quiz version are built before the completions and incremented afterwards
+        self.assertEqual([question['attempts'] for question in self.client.get(url).data], [0, 0])
+
+        wrong_responses = {'questions': [
+            {**question, 'answers': [{**answer, 'is_right': not answer['is_right']} for answer in question['answers']]}
+            for question in self.create_quiz_data_3['questions']
+        ]}
+        for user, user_responses in ((self.user_4, self.create_quiz_data_3), (self.user_2, wrong_responses),
+                                     (self.user_3, self.create_quiz_data_3)):
+            self.client.force_authenticate(user=user)
+            self.client.post(reverse('quiz-start', args=[self.company_1.id, quiz_id]), format='json')
+            self.client.post(reverse('quiz-complete', args=[self.company_1.id, quiz_id]), user_responses,
+                             format='json')
+
+        self.client.force_authenticate(user=self.user_1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(any('responses' in query['sql'] for query in queries))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_question = response.data[0]
+        self.assertEqual(first_question['attempts'], 3)
+        self.assertAlmostEqual(first_question['correct_rate'], 66.67)
+        self.assertEqual({answer['text']: answer['chosen'] for answer in first_question['answers']},
+                         {'Answer 10': 2, 'Answer 11': 1})
+
+        # the counters rebuilt from the stored responses match the incremented ones
+        quiz = Quiz.objects.get(id=quiz_id)
+        get_redis_client().delete(get_question_stats_redis_key(quiz.id, quiz.updated_at.timestamp()))
+        self.assertEqual(self.client.get(url).data, response.data)
+
+        # a result read by the rebuild is not counted again by a late increment
+        result = UserQuizResult.objects.get(quiz=quiz, participant=self.user_3)
+        self.assertFalse(add_quiz_response_counters(result, self.create_quiz_data_3))
+        self.assertEqual(self.client.get(url).data, response.data)
+
+    def test_leaderboards(self):
+        call_command('rebuild_leaderboards', stdout=StringIO())
+        latest_results = [UserQuizResult.objects.filter(participant=user, progress_status=QuizProgressStatus.COMPLETED
+                                                        .value).latest('updated_at')
+                          for user in (self.user_2, self.user_3, self.user_4)]
+        expected_ranking = [result.participant_id for result in
+                            sorted(latest_results, key=lambda result: (result.user_rating, result.participant_id),
+                                   reverse=True)]
+
+        self.client.force_authenticate(user=self.user_4)
+        response = self.client.get(reverse('leaderboard'), {'user_id': self.user_3.id, 'neighbours': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([entry['user']['id'] for entry in response.data['results']], expected_ranking)
+        self.assertEqual(response.data['user']['rank'], expected_ranking.index(self.user_3.id) + 1)
+        self.assertIn(self.user_3.id, [entry['user']['id'] for entry in response.data['user']['neighbours']])
+
+        url = reverse('company-leaderboard', args=[self.company_1.id])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        # a completed quiz updates the leaderboards without a rebuild
+        self.client.force_authenticate(user=self.user_1)
+        quiz_id = self.client.post(self.url_get_quiz_list, self.create_quiz_data_3, format='json') \
+            .data['quizzes'][0]['id']
+        self.client.force_authenticate(user=self.user_3)
+        self.client.post(reverse('quiz-start', args=[self.company_1.id, quiz_id]), format='json')
+        self.client.post(reverse('quiz-complete', args=[self.company_1.id, quiz_id]), self.create_quiz_data_3,
+                         format='json')
+        result = UserQuizResult.objects.get(participant=self.user_3, quiz_id=quiz_id)
+        self.assertEqual(result.progress_status, QuizProgressStatus.COMPLETED.value)
+        response = self.client.get(url, {'user_id': self.user_3.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({entry['user']['id']: entry['score'] for entry in response.data['results']}[self.user_3.id],
+                         float(result.company_average_score))
+        self.assertEqual(get_redis_client().zscore(GLOBAL_LEADERBOARD_KEY, self.user_3.id), float(result.user_rating))
+
+    def test_explain_quiz_result_queries(self):
+        stdout = StringIO()
+        call_command('explain_quiz_result_queries', '--compare', '--disable-seqscan', stdout=stdout)
+        output = stdout.getvalue()
+
+        self.assertIn('uqr_participant_quiz_status', output)
+        self.assertIn('uqr_completed_quiz', output)
+        self.assertIn('without indexes', output)
+        # the indexes are restored after the comparison
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, UserQuizResult._meta.db_table)
+        self.assertTrue({index.name for index in UserQuizResult._meta.indexes} <= set(indexes))
+
+    def test_update_quiz_constant_query_count(self):
+        self.client.force_authenticate(user=self.user_1)
+
+        def get_quiz_data(count_questions):
+            return {
+                'title': 'Quiz title',
+                'questions': [
+                    {
+                        'question_text': f'Question {index}',
+                        'answers': [
+                            {'text': f'Answer {index}', 'is_right': True},
+                            {'text': f'Answer {index + 1}', 'is_right': False},
+                        ]
+                    } for index in range(count_questions)
+                ]
+            }
+
+        query_counts = []
+        for count_questions in (3, 30):
+            self.client.patch(self.url_get_quiz_3, get_quiz_data(count_questions), format='json')
+            quiz_data = self.client.get(self.url_get_quiz_3).data
+            for question_data in quiz_data['questions']:
+                question_data['question_text'] += ' updated'
+                question_data['answers'][0]['is_right'] = False
+                question_data['answers'][1]['is_right'] = True
+
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.patch(self.url_get_quiz_3, quiz_data, format='json')
+            query_counts.append(len(context.captured_queries))
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(self.quiz_3.questions.filter(question_text__endswith=' updated').count(), count_questions)
+            self.assertEqual(
+                set(Answer.objects.filter(question__quiz=self.quiz_3, is_right=True).values_list('text', flat=True)),
+                {f'Answer {index + 1}' for index in range(count_questions)},
+            )
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_answer_ids_by_content(self):
+        answers_data = [
+            {'text': self.answer_1.text, 'is_right': True},
+            {'text': self.answer_1.text, 'is_right': False},
+            {'text': 'New answer', 'is_right': True},
+            {'text': 'New answer', 'is_right': True},
+        ]
+
+        with self.assertNumQueries(3):
+            answer_ids = Answer.get_ids_by_content(answers_data)
+        with self.assertNumQueries(1):
+            self.assertEqual(Answer.get_ids_by_content(answers_data), answer_ids)
+
+        self.assertEqual(len(answer_ids), 3)
+        self.assertEqual(answer_ids[(self.answer_1.text, True)], self.answer_1.id)
+        self.assertEqual(Answer.objects.filter(text='New answer').count(), 1)
+
+    def test_answer_content_immutable(self):
+        self.answer_1.text = 'Changed answer'
+        with self.assertRaises(ValidationError):
+            self.answer_1.save()
+
+        self.answer_1.refresh_from_db()
+        self.answer_1.save()
+        self.assertFalse(Answer.objects.filter(text='Changed answer').exists())
+
+    @staticmethod
+    def get_quiz_file_rows(quiz_data):
+        rows = [
+            ('title', quiz_data['title']),
+            ('description', quiz_data.get('description', 'Quiz description')),
+            ('frequency', quiz_data.get('frequency', 1)),
+        ]
+        for question_data in quiz_data['questions']:
+            rows.append(('question', question_data['question_text']))
+            rows.extend(('answer', answer_data['text'], 'true' if answer_data['is_right'] else 'false')
+                        for answer_data in question_data['answers'])
+        return rows
+
+    def get_quiz_excel_file(self, quizzes_data):
+        workbook = Workbook()
+        workbook.remove(workbook.active)
+        for quiz_data in quizzes_data:
+            worksheet = workbook.create_sheet()
+            for row in self.get_quiz_file_rows(quiz_data):
+                worksheet.append(row)
+
+        file = BytesIO()
+        workbook.save(file)
+        return SimpleUploadedFile('quizzes.xlsx', file.getvalue())
+
+    def test_create_quizzes_from_excel_file(self):
+        self.client.force_authenticate(user=self.user_1)
+        url = f'{self.url_get_quiz_list}?export_file=true'
+
+        file = self.get_quiz_excel_file([self.create_quiz_data, {**self.create_quiz_data, 'title': 'Second quiz'}])
+        response = self.client.post(url, {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Quiz.objects.count(), 5)
+        self.assertEqual(Quiz.objects.get(title='Second quiz').questions.count(),
+                         len(self.create_quiz_data['questions']))
+
+        # an invalid sheet rolls back the sheets inserted before it
+        file = self.get_quiz_excel_file([self.create_quiz_data, self.incorrect_quiz_data_3])
+        response = self.client.post(url, {'file': file}, format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sheet_2', response.data)
+        self.assertEqual(Quiz.objects.count(), 5)
+
+        # an answer row before the first question row is a validation error of its sheet
+        rows = self.get_quiz_file_rows(self.create_quiz_data)
+        workbook = Workbook()
+        worksheet = workbook.active
+        for row in (*rows[:3], ('answer', 'Answer', 'true'), *rows[3:]):
+            worksheet.append(row)
+        file = BytesIO()
+        workbook.save(file)
+        response = self.client.post(url, {'file': SimpleUploadedFile('quizzes.xlsx', file.getvalue())},
+                                    format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sheet_1', response.data)
+        self.assertEqual(Quiz.objects.count(), 5)
+
+        # the worksheets separate the quizzes, so the header rows of a sheet may come in any order
+        workbook = Workbook()
+        worksheet = workbook.active
+        for row in (rows[1], rows[2], rows[0], *rows[3:]):
+            worksheet.append(row)
+        file = BytesIO()
+        workbook.save(file)
+        response = self.client.post(url, {'file': SimpleUploadedFile('quizzes.xlsx', file.getvalue())},
+                                    format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Quiz.objects.count(), 6)
+
+    def test_quiz_import_job(self):
+        self.client.force_authenticate(user=self.user_1)
+        file = self.get_quiz_excel_file([self.create_quiz_data, self.incorrect_quiz_data_3])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse('quiz-import-list', args=[self.company_1.id]), {'file': file},
+                                        format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], QuizImportStatus.PENDING.value)
+        self.assertEqual(len(callbacks), 1)
+
+        import_quizzes(response.data['id'])
+        response = self.client.get(reverse('quiz-import-detail', args=[self.company_1.id, response.data['id']]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], QuizImportStatus.COMPLETED.value)
+        self.assertEqual(response.data['processed_sheets'], 2)
+        self.assertEqual(len(response.data['quizzes']), 1)
+        self.assertEqual(response.data['errors'][0]['sheet'], 2)
+        self.assertFalse(QuizImportJob.objects.get(id=response.data['id']).file)
+
+    def test_quiz_import_job_claimed_once(self):
+        self.client.force_authenticate(user=self.user_1)
+        rows = self.get_quiz_file_rows(self.create_quiz_data)
+        csv_file = StringIO()
+        csv.writer(csv_file).writerows(rows[1:])
+
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(reverse('quiz-import-list', args=[self.company_1.id]),
+                                        {'file': SimpleUploadedFile('quizzes.csv', csv_file.getvalue().encode())},
+                                        format='multipart')
+        import_quizzes(response.data['id'])
+        # a redelivered task does not import the claimed job again
+        import_quizzes(response.data['id'])
+
+        job = QuizImportJob.objects.get(id=response.data['id'])
+        self.assertEqual(job.status, QuizImportStatus.FAILED.value)
+        # the parser error is stored as its messages
+        self.assertEqual(len(job.errors), 1)
+        self.assertTrue(job.errors[0]['message'].startswith('Row 1 '))
+
+    def test_quiz_import_job_non_owner(self):
+        self.client.force_authenticate(user=self.user_4)
+        file = self.get_quiz_excel_file([self.create_quiz_data])
+
+        response = self.client.post(reverse('quiz-import-list', args=[self.company_1.id]), {'file': file},
+                                    format='multipart')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(QuizImportJob.objects.exists())
+
+    def test_create_quizzes_from_csv_and_ndjson_files(self):
+        self.client.force_authenticate(user=self.user_1)
+        url = f'{self.url_get_quiz_list}?export_file=true'
+        quizzes_data = [self.create_quiz_data, {**self.create_quiz_data, 'title': 'Second quiz'}]
+        rows = [row for quiz_data in quizzes_data for row in self.get_quiz_file_rows(quiz_data)]
+
+        csv_file = StringIO()
+        csv.writer(csv_file).writerows(rows)
+        ndjson_file = '\n'.join(json.dumps(row) for row in rows)
+
+        for file in (SimpleUploadedFile('quizzes.csv', csv_file.getvalue().encode()),
+                     SimpleUploadedFile('quizzes.ndjson', ndjson_file.encode())):
+            response = self.client.post(url, {'file': file}, format='multipart')
+
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data['quizzes']), 2)
+            self.assertEqual(response.data['quizzes'][1]['title'], 'Second quiz')
+            self.assertEqual(len(response.data['quizzes'][1]['questions']), len(self.create_quiz_data['questions']))
+
+        self.assertEqual(Quiz.objects.count(), 7)
+
+        # a quiz with reordered header rows is rejected instead of being merged into the previous quiz
+        second_quiz_rows = self.get_quiz_file_rows(quizzes_data[1])
+        second_quiz_rows[:2] = second_quiz_rows[1::-1]
+        csv_file = StringIO()
+        csv.writer(csv_file).writerows([*self.get_quiz_file_rows(quizzes_data[0]), *second_quiz_rows])
+        for content in (csv_file.getvalue().encode(), 'title,Quiz\n'.encode('utf-16')):
+            response = self.client.post(url, {'file': SimpleUploadedFile('quizzes.csv', content)}, format='multipart')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(Quiz.objects.count(), 7)
+
+    def test_company_quiz_results_streaming_export(self):
+        self.client.force_authenticate(user=self.user_1)
+        url = reverse('company-quiz-results-list', args=[self.company_1.id])
+        count_results = self.client.get(url).data['count']
+        self.assertGreater(count_results, 0)
+
+        response = self.client.get(url, {'export_format': 'csv'})
+        # the flat export projection is loaded with a single query
+        with self.assertNumQueries(1):
+            rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(rows[0][:2], ['id', 'participant'])
+        self.assertEqual(len(rows), count_results + 1)
+        self.assertEqual({row[2] for row in rows[1:]}, {self.company_1.name})
+
+        response = self.client.get(url, {'export_format': 'json'})
+        results = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(results), count_results)
+        self.assertEqual(results[0]['company']['name'], self.company_1.name)
+
+    def test_company_quiz_results_references_and_expand(self):
+        self.client.force_authenticate(user=self.user_1)
+        url = reverse('company-quiz-results-list', args=[self.company_1.id])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        queries_count = len(queries)
+
+        result = response.data['results'][0]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(result['participant']), {'id', 'username', 'first_name', 'last_name', 'avatar'})
+        self.assertEqual(result['company'], {'id': self.company_1.id, 'name': self.company_1.name})
+        self.assertEqual(set(result['quiz']), {'id', 'title'})
+
+        UserQuizResultCompletionFactory(participant=UserFactory(), company=self.company_1, quiz=self.quiz_1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertLessEqual(len(queries), queries_count)
+
+        response = self.client.get(url, {'expand': 'company,participant'})
+
+        result = response.data['results'][0]
+        self.assertIn('is_admin', result['company'])
+        self.assertIn('rating', result['participant'])
+        self.assertEqual(set(result['quiz']), {'id', 'title'})
+
+        # the expanded relations of a page are preloaded, so more rows do not add queries
+        expand = {'expand': 'company,participant,quiz'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, expand)
+        queries_count = len(queries)
+        self.assertIn('auth_user_last_completed', response.data['results'][0]['quiz'])
+        self.assertIn('rating', response.data['results'][0]['quiz']['company']['owner'])
+
+        for quiz in (self.quiz_1, self.quiz_3):
+            UserQuizResultCompletionFactory(participant=UserFactory(), company=self.company_1, quiz=quiz)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, expand)
+        self.assertLessEqual(len(queries), queries_count)
+
+    def test_company_quiz_results_columnar_export(self):
+        self.client.force_authenticate(user=self.user_1)
+        url = reverse('company-quiz-results-list', args=[self.company_1.id])
+        result_ids = sorted(result['id'] for result in self.client.get(url).data['results'])
+
+        response = self.client.get(url, {'export_format': 'parquet'})
+        table = pq.read_table(BytesIO(b''.join(response.streaming_content)))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(table.column('id').to_pylist()), result_ids)
+        self.assertEqual(table.schema.field('date_passed').type, pa.timestamp('us', tz='UTC'))
+
+        response = self.client.get(url, {'export_format': 'arrow'})
+        table = pa.ipc.open_file(pa.py_buffer(b''.join(response.streaming_content))).read_all()
+
+        self.assertEqual(sorted(table.column('id').to_pylist()), result_ids)
+        self.assertEqual(set(table.column('company').to_pylist()), {self.company_1.name})
+
+        response = self.client.get(url, {'export_format': 'xlsx'})
+        worksheet = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        rows = list(worksheet.iter_rows(values_only=True))
+
+        self.assertEqual(rows[0][:2], ('id', 'participant'))
+        self.assertEqual(sorted(row[0] for row in rows[1:]), result_ids)
+
+    def test_quiz_daily_stats_maintained_on_completion(self):
+        self.client.force_authenticate(user=self.user_1)
+        response = self.client.post(self.url_get_quiz_list, self.create_quiz_data_2, format='json')
+        quiz_id = response.data['quizzes'][0]['id']
+
+        for user in (self.user_2, self.user_4):
+            self.client.force_authenticate(user=user)
+            self.client.post(reverse('quiz-start', args=[self.company_1.id, quiz_id]), format='json')
+            self.client.post(reverse('quiz-complete', args=[self.company_1.id, quiz_id]), self.quiz_complete_data_2,
+                             format='json')
+
+        stats = QuizDailyStats.objects.get(quiz_id=quiz_id)
+        results = UserQuizResult.objects.filter(quiz_id=quiz_id, progress_status=QuizProgressStatus.COMPLETED.value)
+        self.assertEqual(stats.attempts, 2)
+        self.assertEqual(sum(stats.score_histogram), 2)
+        self.assertAlmostEqual(stats.mean_score, results[0].correct_answers / results[0].total_questions * 100,
+                               places=2)
+
+        # the rebuilt statistics match the incrementally maintained ones
+        call_command('rebuild_quiz_stats', quiz_id, stdout=StringIO())
+        rebuilt_stats = QuizDailyStats.objects.get(quiz_id=quiz_id)
+        self.assertEqual(rebuilt_stats.attempts, stats.attempts)
+        self.assertEqual(rebuilt_stats.score_histogram, stats.score_histogram)
+        self.assertEqual(rebuilt_stats.quiz_time_sum, stats.quiz_time_sum)
+        self.assertAlmostEqual(rebuilt_stats.score_sum, stats.score_sum)
+
+    def test_analytics_series(self):
+        self.client.force_authenticate(user=self.user_3)
+        call_command('rebuild_quiz_stats', stdout=StringIO())
+        completed_results = UserQuizResult.objects.filter(progress_status=QuizProgressStatus.COMPLETED.value)
+
+        for bucket in ('hour', 'day', 'month'):
+            response = self.client.get(reverse('quiz-analytics-list'), {'metric': 'attempts', 'bucket': bucket})
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            series = {quiz['id']: quiz['series'] for quiz in response.data['results']}
+            self.assertEqual(sum(point['value'] for point in series[self.quiz_3.id]),
+                             completed_results.filter(quiz=self.quiz_3).count())
+
+        response = self.client.get(reverse('user-analytics-list'), {'metric': 'mean_score', 'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+
+        response = self.client.get(reverse('user-analytics-list'), {'metric': 'unknown'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse('company-analytics-detail', args=[self.company_1.id]),
+                                   {'metric': 'mean_quiz_time', 'bucket': 'week', 'date_from': '2000-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({quiz['id'] for quiz in response.data['results']}, {self.quiz_1.id, self.quiz_3.id})
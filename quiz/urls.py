@@ -13,6 +13,16 @@ urlpatterns = [
         QuizViewSet.as_view({'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'}),
         name='quiz-detail',
     ),
+    path(
+        'companies/<int:company_pk>/quizzes/imports/',
+        QuizViewSet.as_view({'post': 'quiz_import'}),
+        name='quiz-import-list'
+    ),
+    path(
+        'companies/<int:company_pk>/quizzes/imports/<int:pk>/',
+        QuizViewSet.as_view({'get': 'quiz_import_detail'}),
+        name='quiz-import-detail'
+    ),
     path(
         'companies/<int:company_pk>/quizzes/<int:pk>/start/',
         QuizViewSet.as_view({'post': 'quiz_start'}),
@@ -23,6 +33,16 @@ urlpatterns = [
         QuizViewSet.as_view({'post': 'quiz_complete'}),
         name='quiz-complete'
     ),
+    path(
+        'companies/<int:company_pk>/quizzes/<int:pk>/statistics/',
+        QuizViewSet.as_view({'get': 'quiz_statistics'}),
+        name='quiz-statistics'
+    ),
+    path(
+        'companies/<int:company_pk>/quizzes/<int:pk>/statistics/questions/',
+        QuizViewSet.as_view({'get': 'quiz_question_statistics'}),
+        name='quiz-question-statistics'
+    ),
     path(
         'companies/<int:company_pk>/quizzes/results/',
         QuizViewSet.as_view({'get': 'company_quiz_results'}),
@@ -46,4 +66,15 @@ urlpatterns = [
         QuizViewSet.as_view({'get': 'company_analytics'}),
         name='company-analytics-detail',
     ),
+    path(
+        'analytics/companies/<int:pk>/statistics/',
+        QuizViewSet.as_view({'get': 'company_statistics'}),
+        name='company-statistics-detail',
+    ),
+    path('analytics/leaderboard/', QuizViewSet.as_view({'get': 'leaderboard'}), name='leaderboard'),
+    path(
+        'analytics/companies/<int:pk>/leaderboard/',
+        QuizViewSet.as_view({'get': 'company_leaderboard'}),
+        name='company-leaderboard',
+    ),
 ]
@@ -1,5 +1,9 @@
+from functools import partial
+
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Prefetch, Q
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from rest_framework import status, viewsets
@@ -8,8 +12,13 @@ from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from common.cache.leaderboards import GLOBAL_LEADERBOARD_KEY, get_company_leaderboard_key, get_leaderboard
+from common.cache.question_stats import add_quiz_response_counters, get_quiz_question_statistics
+from common.cache.quiz_payload import get_quiz_payload
+from common.cache.statistics import get_company_statistics, get_quiz_statistics
 from common.cache.user_quiz_answers import cache_user_quiz_response
 from common.enums import QuizProgressStatus
+from common.pagination import SettingsCursorPagination
 from common.permissions import (
     FrequencyLimit,
     IsCompanyAdmin,
@@ -19,19 +28,25 @@ from common.permissions import (
     IsUserQuizResultParticipant,
     ReadOnly,
 )
+from common.roles import ADMIN, MEMBER, OWNER, get_company_roles
 from common.views import get_serializer_paginate, get_user_quiz_result_response
 from company.models import Company
-from quiz.models import Quiz, UserQuizResult
+from quiz.models import Quiz, QuizDailyStats, QuizImportJob, UserQuizResult
 from quiz.serializers import (
+    AnalyticsSeriesParamsSerializer,
     CompanyAnalyticsSerializer,
+    LeaderboardParamsSerializer,
     QuizAnalyticsSerializer,
     QuizDetailSerializer,
+    QuizImportJobSerializer,
     QuizSerializer,
     UserAnalyticsSerializer,
     UserQuizResultDetailSerializer,
 )
+from services.analytics.series import get_quizzes_series, get_results_series
 
 from .filters import UserQuizResultFilter
+from .tasks import import_quizzes_task
 
 User = get_user_model()
 
@@ -41,7 +56,8 @@ class QuizViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         if self.action in ('quizzes_analytics', 'users_analytics', 'user_analytics', 'user_quizzes_list',
-                           'user_all_quiz_results', 'company_analytics'):
+                           'user_all_quiz_results', 'company_analytics', 'company_statistics', 'leaderboard',
+                           'company_leaderboard'):
             return None
 
         company = get_object_or_404(Company, id=self.kwargs.get('company_pk'))
@@ -61,8 +77,11 @@ class QuizViewSet(viewsets.ModelViewSet):
             permission_classes = (IsUserQuizResultParticipant, )
         elif self.action in ('company_quiz_results', 'company_member_quiz_results'):
             permission_classes = (IsCompanyOwner | IsCompanyAdmin, IsCompanyMember)
+        elif self.action in ('quiz_import', 'quiz_import_detail', 'quiz_statistics', 'quiz_question_statistics'):
+            permission_classes = (IsCompanyOwner | IsCompanyAdmin, )
         elif self.action in ('quizzes_analytics', 'users_analytics', 'user_analytics', 'user_quizzes_list',
-                             'user_all_quiz_results', 'company_analytics'):
+                             'user_all_quiz_results', 'company_analytics', 'company_statistics', 'leaderboard',
+                             'company_leaderboard'):
             permission_classes = (IsAuthenticated, )
 
         return [permission() for permission in permission_classes]
@@ -88,12 +107,8 @@ class QuizViewSet(viewsets.ModelViewSet):
         context = super().get_serializer_context()
 
         company_pk = self.kwargs.get('company_pk', None)
-        if company_pk:
-            company = get_object_or_404(Company, id=self.kwargs.get('company_pk'))
-
-            if IsCompanyOwner().has_object_permission(self.request, self, company) \
-                    or IsCompanyAdmin().has_object_permission(self.request, self, company):
-                context.update({'full_access': True})
+        if company_pk and get_company_roles(self.request).has_role(company_pk, OWNER, ADMIN):
+            context.update({'full_access': True})
 
         return context
 
@@ -111,10 +126,27 @@ class QuizViewSet(viewsets.ModelViewSet):
     def quiz_start(self, request, company_pk=None, pk=None):
         if not company_pk or not pk:
             raise NotFound({'message': _('Page not found.')})
-        quiz = get_object_or_404(Quiz, id=pk)
-        serializer = self.get_serializer_class()(quiz, context={'request': request})
-        UserQuizResult.objects.get_or_create(participant=request.user, quiz=quiz, company_id=company_pk,
-                                             progress_status=QuizProgressStatus.STARTED.value)
+        quiz = get_object_or_404(Quiz.objects.select_related('company__owner'), id=pk)
+        UserQuizResult.start(request.user, quiz, company_pk)
+        return HttpResponse(get_quiz_payload(quiz, context={'request': request}), content_type='application/json',
+                            status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def quiz_import(self, request, company_pk=None):
+        if not company_pk:
+            raise NotFound({'message': _('Page not found.')})
+        serializer = QuizImportJobSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        import_job = serializer.save(company_id=company_pk, created_by=request.user)
+        transaction.on_commit(lambda: import_quizzes_task.delay(import_job.id))
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def quiz_import_detail(self, request, company_pk=None, pk=None):
+        if not company_pk or not pk:
+            raise NotFound({'message': _('Page not found.')})
+        import_job = get_object_or_404(QuizImportJob, id=pk, company_id=company_pk)
+        serializer = QuizImportJobSerializer(import_job, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -126,6 +158,7 @@ class QuizViewSet(viewsets.ModelViewSet):
         quiz_result.quiz_completed(request.data)
         serializer = self.get_serializer_class()(quiz_result, context={'request': request})
         cache_user_quiz_response(quiz_result, request.data)
+        add_quiz_response_counters(quiz_result, request.data)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
@@ -171,19 +204,49 @@ class QuizViewSet(viewsets.ModelViewSet):
 
         return get_user_quiz_result_response(self, request, queryset, context={'request': request})
 
+    def get_analytics_series_response(self, request, entities, get_series):
+        """
+        Response with a cursor-paginated page of entities and their aggregated time series.
+            :param entities: A queryset of dictionaries with the 'id' and 'name' of the entities
+            :param get_series: A function returning the series of the given entity IDs and series parameters
+        """
+        params_serializer = AnalyticsSeriesParamsSerializer(data=request.query_params)
+        params_serializer.is_valid(raise_exception=True)
+
+        paginator = SettingsCursorPagination()
+        page = paginator.paginate_queryset(entities, request, view=self)
+        series = get_series([entity['id'] for entity in page], **params_serializer.validated_data)
+
+        return paginator.get_paginated_response([{**entity, 'series': series.get(entity['id'], [])} for entity in page])
+
     @action(detail=False, methods=['get'])
     def quizzes_analytics(self, request):
-        queryset = Quiz.objects.all().order_by(*self.ordering)
+        if 'metric' in request.query_params:
+            return self.get_analytics_series_response(
+                request,
+                Quiz.objects.values('id', name=F('title')),
+                partial(get_quizzes_series, UserQuizResult.objects.all()),
+            )
+
+        queryset = Quiz.objects.prefetch_related(
+            Prefetch('daily_stats', queryset=QuizDailyStats.objects.order_by('date'))
+        ).order_by(*self.ordering)
 
         serializer = self.get_serializer_class()(queryset, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'])
     def users_analytics(self, request):
-        queryset = User.objects.all().order_by(*self.ordering)
+        if 'metric' in request.query_params:
+            return self.get_analytics_series_response(
+                request,
+                User.objects.values('id', name=F('username')),
+                partial(get_results_series, UserQuizResult.objects.all(), 'participant_id'),
+            )
 
-        serializer = self.get_serializer_class()(queryset, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        queryset = User.objects.all().order_by(*self.ordering, 'id')
+
+        return get_serializer_paginate(self, queryset, self.get_serializer_class(), context={'request': request})
 
     @action(detail=True, methods=['get'])
     def user_analytics(self, request, pk=None):
@@ -197,17 +260,68 @@ class QuizViewSet(viewsets.ModelViewSet):
         if not pk:
             raise NotFound({'message': _('Page not found.')})
 
-        queryset = get_object_or_404(Company, id=pk)
+        if not get_company_roles(request).has_role(pk, OWNER, ADMIN):
+            return Response({'message': _('Permission Denied')}, status=status.HTTP_403_FORBIDDEN)
 
-        is_owner = IsCompanyOwner().has_object_permission(request, self, queryset)
-        is_admin = IsCompanyAdmin().has_object_permission(request, self, queryset)
+        queryset = get_object_or_404(Company, id=pk)
 
-        if not (is_owner or is_admin):
-            return Response({'message': _('Permission Denied')}, status=status.HTTP_403_FORBIDDEN)
+        if 'metric' in request.query_params:
+            return self.get_analytics_series_response(
+                request,
+                Quiz.objects.filter(company=queryset).values('id', name=F('title')),
+                partial(get_quizzes_series, UserQuizResult.objects.filter(company=queryset)),
+            )
 
         serializer = self.get_serializer_class()(queryset, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'])
+    def company_statistics(self, request, pk=None):
+        if not get_company_roles(request).has_role(pk, OWNER, ADMIN):
+            return Response({'message': _('Permission Denied')}, status=status.HTTP_403_FORBIDDEN)
+
+        return Response(get_company_statistics(get_object_or_404(Company, id=pk)), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def quiz_statistics(self, request, company_pk=None, pk=None):
+        quiz = get_object_or_404(Quiz, id=pk, company_id=company_pk)
+
+        return Response(get_quiz_statistics(quiz), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def quiz_question_statistics(self, request, company_pk=None, pk=None):
+        quiz = get_object_or_404(Quiz, id=pk, company_id=company_pk)
+
+        return Response(get_quiz_question_statistics(quiz), status=status.HTTP_200_OK)
+
+    def get_leaderboard_response(self, request, redis_key):
+        """
+        Response with the top entries of a leaderboard and the rank of the requested user with their neighbours.
+            :param redis_key: The key of the leaderboard sorted set
+        """
+        params_serializer = LeaderboardParamsSerializer(data=request.query_params)
+        params_serializer.is_valid(raise_exception=True)
+
+        leaderboard = get_leaderboard(redis_key, **params_serializer.validated_data)
+        entries = leaderboard['results'] + (leaderboard.get('user') or {}).get('neighbours', [])
+        users = {user['id']: user for user in User.objects.filter(id__in={entry['user_id'] for entry in entries})
+                 .values('id', 'username', 'first_name', 'last_name')}
+        for entry in entries:
+            entry['user'] = users.get(entry.pop('user_id'))
+
+        return Response(leaderboard, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def leaderboard(self, request):
+        return self.get_leaderboard_response(request, GLOBAL_LEADERBOARD_KEY)
+
+    @action(detail=True, methods=['get'])
+    def company_leaderboard(self, request, pk=None):
+        if not get_company_roles(request).has_role(pk, OWNER, ADMIN, MEMBER):
+            return Response({'message': _('Permission Denied')}, status=status.HTTP_403_FORBIDDEN)
+
+        return self.get_leaderboard_response(request, get_company_leaderboard_key(pk))
+
     @action(detail=False, methods=['get'])
     def user_all_quiz_results(self, request, pk=None):
         if not pk or pk != request.user.id:
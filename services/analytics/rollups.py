@@ -0,0 +1,153 @@
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, IntegerField, JSONField, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Floor, Least, TruncDate
+
+from common.enums import QuizProgressStatus
+
+SCORE_HISTOGRAM_BINS = 10
+SCORE_BIN_WIDTH = 100 / SCORE_HISTOGRAM_BINS
+
+
+def get_score_bin(score):
+    """
+    Get the histogram bin of a score in percent, the last bin includes the maximum score.
+    """
+    return min(int(score // SCORE_BIN_WIDTH), SCORE_HISTOGRAM_BINS - 1)
+
+
+def get_histogram_percentile(histogram, percentile):
+    """
+    Estimate a score percentile from a score histogram, assuming the scores are uniformly distributed in a bin.
+    Args:
+        histogram (list): The number of scores in each bin.
+        percentile (float): The percentile between 0 and 100.
+    Returns:
+        float | None: The estimated score or None if the histogram is empty.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+
+    rank = total * percentile / 100
+    cumulative = 0
+    for bin_index, count in enumerate(histogram):
+        if count and cumulative + count >= rank:
+            return round((bin_index + (rank - cumulative) / count) * SCORE_BIN_WIDTH, 2)
+        cumulative += count
+
+    return 100.0
+
+
+def get_histogram_increment(field_name, bin_index):
+    """
+    Expression adding one to a bin of a JSON histogram field in an UPDATE query, without reading the row.
+    """
+    return RawSQL(f'jsonb_set({field_name}, %s, to_jsonb(({field_name} ->> %s)::int + 1))',
+                  (f'{{{bin_index}}}', bin_index), output_field=JSONField())
+
+
+def get_score_expression():
+    """
+    Score of a quiz result in percent, the results must have at least one question.
+    """
+    return ExpressionWrapper(F('correct_answers') * 100.0 / F('total_questions'), output_field=FloatField())
+
+
+def rebuild_quiz_daily_stats(quiz_ids=None):
+    """
+    Rebuild the daily statistics of quizzes from their completed results with a single aggregate query.
+    Args:
+        quiz_ids (list | None): IDs of the quizzes to rebuild, all quizzes if None.
+    Returns:
+        int: The number of created daily statistics.
+    """
+    from quiz.models import QuizDailyStats, UserQuizResult
+
+    results = UserQuizResult.objects.filter(
+        quiz__isnull=False,
+        progress_status=QuizProgressStatus.COMPLETED.value,
+        total_questions__gt=0,
+    )
+    if quiz_ids is not None:
+        results = results.filter(quiz_id__in=quiz_ids)
+
+    score = get_score_expression()
+    stale_stats = QuizDailyStats.objects.all()
+    if quiz_ids is not None:
+        stale_stats = stale_stats.filter(quiz_id__in=quiz_ids)
+
+    # the deleted rows stay locked until the commit, so the results are read after the concurrent completions
+    # that updated them have committed and the completions waiting for them count their results after the rebuild
+    with transaction.atomic():
+        stale_stats.delete()
+
+        rows = results.annotate(
+            date=TruncDate('updated_at'),
+            score_bin=Least(Cast(Floor(score / SCORE_BIN_WIDTH), IntegerField()), SCORE_HISTOGRAM_BINS - 1),
+        ).values('quiz_id', 'date', 'score_bin').annotate(
+            attempts=Count('id'),
+            score_sum=Sum(score),
+            quiz_time_sum=Sum('quiz_time'),
+        ).order_by()
+
+        daily_stats = {}
+        for row in rows:
+            key = (row['quiz_id'], row['date'])
+            if key not in daily_stats:
+                daily_stats[key] = QuizDailyStats(quiz_id=row['quiz_id'], date=row['date'], attempts=0, score_sum=0,
+                                                  score_histogram=[0] * SCORE_HISTOGRAM_BINS)
+            stats = daily_stats[key]
+            stats.attempts += row['attempts']
+            stats.score_sum += row['score_sum']
+            stats.quiz_time_sum += row['quiz_time_sum']
+            stats.score_histogram[row['score_bin']] += row['attempts']
+
+        return len(QuizDailyStats.objects.bulk_create(daily_stats.values()))
+
+
+def get_user_stats_rows(results, *group_fields):
+    return results.values(*group_fields).annotate(
+        completed_quizzes=Count('id'),
+        correct_answers_sum=Sum('correct_answers'),
+        total_questions_sum=Sum('total_questions'),
+    ).order_by()
+
+
+def rebuild_user_stats(participant_ids=None):
+    """
+    Rebuild the running totals of users and of users per company from their completed results.
+    Args:
+        participant_ids (list | None): IDs of the users to rebuild, all users if None.
+    Returns:
+        int: The number of rebuilt user stats.
+    """
+    from quiz.models import UserCompanyStats, UserQuizResult, UserStats
+
+    results = UserQuizResult.objects.filter(
+        participant__isnull=False,
+        progress_status=QuizProgressStatus.COMPLETED.value,
+    )
+    user_stats = UserStats.objects.all()
+    company_stats = UserCompanyStats.objects.all()
+    if participant_ids is not None:
+        results = results.filter(participant_id__in=participant_ids)
+        user_stats = user_stats.filter(user_id__in=participant_ids)
+        company_stats = company_stats.filter(user_id__in=participant_ids)
+
+    # the deleted rows stay locked until the commit, the concurrent completions of the users wait for the rebuild
+    with transaction.atomic():
+        user_stats.delete()
+        company_stats.delete()
+
+        UserCompanyStats.objects.bulk_create(
+            UserCompanyStats(user_id=row['participant_id'], company_id=row['company_id'],
+                             completed_quizzes=row['completed_quizzes'], correct_answers=row['correct_answers_sum'],
+                             total_questions=row['total_questions_sum'])
+            for row in get_user_stats_rows(results.filter(company__isnull=False), 'participant_id', 'company_id')
+        )
+        return len(UserStats.objects.bulk_create(
+            UserStats(user_id=row['participant_id'], completed_quizzes=row['completed_quizzes'],
+                      correct_answers=row['correct_answers_sum'], total_questions=row['total_questions_sum'])
+            for row in get_user_stats_rows(results, 'participant_id')
+        ))
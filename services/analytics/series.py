@@ -0,0 +1,116 @@
+from collections import defaultdict
+
+from django.db.models import Avg, Count, DateField, Sum
+from django.db.models.functions import Trunc
+from rest_framework import serializers
+
+from common.enums import QuizProgressStatus
+
+from .rollups import get_score_expression
+
+BUCKET_SIZES = ('hour', 'day', 'week', 'month')
+# the daily rollups can serve the buckets of a day or longer
+ROLLUP_BUCKET_SIZES = ('day', 'week', 'month')
+SERIES_METRICS = ('attempts', 'mean_score', 'mean_quiz_time')
+
+RESULT_METRICS = {
+    'attempts': lambda: Count('id'),
+    'mean_score': lambda: Avg(get_score_expression()),
+    'mean_quiz_time': lambda: Avg('quiz_time'),
+}
+
+
+def get_bucket(field_name, bucket_size):
+    if bucket_size == 'hour':
+        return Trunc(field_name, bucket_size)
+    return Trunc(field_name, bucket_size, output_field=DateField())
+
+
+def format_value(metric, value):
+    if value is None:
+        return None
+    if metric == 'mean_score':
+        return round(value, 2)
+    if metric == 'mean_quiz_time':
+        return serializers.DurationField().to_representation(value)
+    return value
+
+
+def get_results_series(results, group_field, entity_ids, metric, bucket='day', date_from=None, date_to=None):
+    """
+    Aggregate the completed results of the entities into time buckets with a single query.
+    Args:
+        results (QuerySet): The quiz results to aggregate.
+        group_field (str): The result field of the entity ID, e.g. 'quiz_id' or 'participant_id'.
+        entity_ids (list): IDs of the entities of the current page.
+        metric (str): One of SERIES_METRICS.
+        bucket (str): One of BUCKET_SIZES.
+        date_from (date | None): The first included completion day.
+        date_to (date | None): The last included completion day.
+    Returns:
+        dict: Dictionary {entity ID: [{'bucket': ..., 'value': ...}, ...]} sorted by bucket.
+    """
+    results = results.filter(
+        progress_status=QuizProgressStatus.COMPLETED.value,
+        total_questions__gt=0,
+        **{f'{group_field}__in': entity_ids},
+    )
+    if date_from:
+        results = results.filter(updated_at__date__gte=date_from)
+    if date_to:
+        results = results.filter(updated_at__date__lte=date_to)
+
+    rows = results.annotate(bucket=get_bucket('updated_at', bucket)).values(group_field, 'bucket') \
+        .annotate(value=RESULT_METRICS[metric]()).order_by(group_field, 'bucket')
+
+    series = defaultdict(list)
+    for row in rows:
+        series[row[group_field]].append({'bucket': row['bucket'], 'value': format_value(metric, row['value'])})
+    return series
+
+
+def get_rollup_series(quiz_ids, metric, bucket='day', date_from=None, date_to=None):
+    """
+    Aggregate the daily statistics of quizzes into time buckets of a day or longer with a single query.
+    Args:
+        quiz_ids (list): IDs of the quizzes of the current page.
+        metric (str): One of SERIES_METRICS.
+        bucket (str): One of ROLLUP_BUCKET_SIZES.
+        date_from (date | None): The first included day.
+        date_to (date | None): The last included day.
+    Returns:
+        dict: Dictionary {quiz ID: [{'bucket': ..., 'value': ...}, ...]} sorted by bucket.
+    """
+    from quiz.models import QuizDailyStats
+
+    daily_stats = QuizDailyStats.objects.filter(quiz_id__in=quiz_ids)
+    if date_from:
+        daily_stats = daily_stats.filter(date__gte=date_from)
+    if date_to:
+        daily_stats = daily_stats.filter(date__lte=date_to)
+
+    rows = daily_stats.annotate(bucket=get_bucket('date', bucket)).values('quiz_id', 'bucket').annotate(
+        total_attempts=Sum('attempts'),
+        total_score=Sum('score_sum'),
+        total_quiz_time=Sum('quiz_time_sum'),
+    ).order_by('quiz_id', 'bucket')
+
+    series = defaultdict(list)
+    for row in rows:
+        attempts = row['total_attempts']
+        value = {
+            'attempts': attempts,
+            'mean_score': row['total_score'] / attempts if attempts else None,
+            'mean_quiz_time': row['total_quiz_time'] / attempts if attempts else None,
+        }[metric]
+        series[row['quiz_id']].append({'bucket': row['bucket'], 'value': format_value(metric, value)})
+    return series
+
+
+def get_quizzes_series(results, quiz_ids, metric, bucket='day', date_from=None, date_to=None):
+    """
+    Aggregate the results of quizzes into time buckets, the daily rollups are used when the bucket allows it.
+    """
+    if bucket in ROLLUP_BUCKET_SIZES:
+        return get_rollup_series(quiz_ids, metric, bucket, date_from, date_to)
+    return get_results_series(results, 'quiz_id', quiz_ids, metric, bucket, date_from, date_to)
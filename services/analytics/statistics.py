@@ -0,0 +1,203 @@
+from collections import defaultdict
+
+import numpy as np
+
+from common.enums import QuizProgressStatus
+from services.grading.regrade import (
+    encode_choice,
+    encode_choices,
+    get_question_scores,
+    get_response_structure,
+    get_structure_alignment,
+    iter_batches,
+)
+
+from .rollups import SCORE_HISTOGRAM_BINS
+
+STATISTICS_PERCENTILES = (10, 25, 50, 75, 90, 95)
+QUIZ_TIME_HISTOGRAM_BINS = 10
+STATISTICS_BATCH_SIZE = 2000
+# a question score at this value or above counts as a fully correct answer
+FULL_SCORE = 1 - 1e-9
+
+
+def get_statistics_results(results):
+    """
+    Completed results with at least one question, the results included in the statistics.
+        :param results: A queryset of quiz results
+    """
+    return results.filter(progress_status=QuizProgressStatus.COMPLETED.value, total_questions__gt=0)
+
+
+def get_distribution(values, bins, value_range=None):
+    """
+    Summary, percentiles and histogram of a flat array of values.
+        :param values: A one-dimensional NumPy array
+        :param bins: The number of histogram bins
+        :param value_range: The (lower, upper) range of the histogram, the range of the values if None
+        :return: Dictionary with the summary, the percentiles and the histogram of the values
+    """
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    histogram = {'edges': np.round(edges, 2).tolist(), 'counts': counts.tolist()}
+
+    if not len(values):
+        return {
+            'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None,
+            'percentiles': {f'p{percentile}': None for percentile in STATISTICS_PERCENTILES},
+            'histogram': histogram,
+        }
+
+    percentiles = np.percentile(values, STATISTICS_PERCENTILES)
+    return {
+        'count': len(values),
+        'mean': round(float(values.mean()), 2),
+        'std': round(float(values.std()), 2),
+        'min': round(float(values.min()), 2),
+        'max': round(float(values.max()), 2),
+        'percentiles': {f'p{percentile}': round(float(value), 2)
+                        for percentile, value in zip(STATISTICS_PERCENTILES, percentiles, strict=True)},
+        'histogram': histogram,
+    }
+
+
+def get_results_statistics(results):
+    """
+    Score and quiz time distributions of the completed results with a single query.
+    The scores are in percent and the quiz times in seconds.
+        :param results: A queryset of quiz results
+        :return: Dictionary with the 'score' and 'quiz_time' distributions
+    """
+    rows = list(get_statistics_results(results).values_list('correct_answers', 'total_questions', 'quiz_time'))
+
+    correct_answers = np.array([row[0] for row in rows], dtype=float)
+    total_questions = np.array([row[1] for row in rows], dtype=float)
+    quiz_times = np.array([row[2].total_seconds() for row in rows], dtype=float)
+
+    return {
+        'score': get_distribution(correct_answers / total_questions * 100, SCORE_HISTOGRAM_BINS, (0, 100)),
+        'quiz_time': get_distribution(quiz_times, QUIZ_TIME_HISTOGRAM_BINS),
+    }
+
+
+def get_counter_field(counter, question_id, answer_id=None):
+    if answer_id is None:
+        return f'{counter}:{question_id}'
+    return f'{counter}:{question_id}:{answer_id}'
+
+
+def get_response_counters(answer_key, user_responses):
+    """
+    Question counters of a single graded response, the increments applied when a quiz is completed.
+        :param answer_key: The answer key the response was graded with
+        :param user_responses: The user responses to the quiz questions
+        :return: Dictionary {counter field: increment}
+    """
+    counters = defaultdict(int)
+
+    question_scores = answer_key.get_question_scores(user_responses)
+    for question_index, (question_score, user_question) in enumerate(
+            zip(question_scores, user_responses.get('questions'), strict=False)):
+        question_id = answer_key.question_ids[question_index]
+        counters[get_counter_field('attempts', question_id)] += 1
+        counters[get_counter_field('score', question_id)] += question_score
+        counters[get_counter_field('correct', question_id)] += int(question_score >= FULL_SCORE)
+
+        for answer_index, user_answer in zip(answer_key.get_answer_range(question_index),
+                                             user_question.get('answers'), strict=True):
+            if encode_choice(user_answer.get('is_right')) == 1:
+                counters[get_counter_field('chosen', question_id, answer_key.answer_ids[answer_index])] += 1
+
+    return dict(counters)
+
+
+def get_question_counters(answer_key, results, batch_size=STATISTICS_BATCH_SIZE):
+    """
+    Question counters of the completed results computed from their stored responses.
+    The responses are regraded with the answer key, responses that no longer match the quiz are skipped.
+        :param answer_key: The current answer key of the quiz
+        :param results: A queryset of the quiz results
+        :param batch_size: The number of responses loaded and graded per batch
+        :return: Dictionary {counter field: value} and the list of IDs of the results read
+    """
+    total_questions = answer_key.total_questions
+    attempts = np.zeros(total_questions, dtype=np.int64)
+    score_sums = np.zeros(total_questions)
+    full_scores = np.zeros(total_questions, dtype=np.int64)
+    chosen = np.zeros(len(answer_key.answer_ids), dtype=np.int64)
+    result_ids = []
+
+    responses = get_statistics_results(results).filter(responses__isnull=False) \
+        .values_list('id', 'responses').iterator(chunk_size=batch_size)
+    for batch in iter_batches(responses, batch_size):
+        groups = defaultdict(list)
+        for result_id, response_rows in batch:
+            result_ids.append(result_id)
+            groups[get_response_structure(response_rows)].append(response_rows)
+
+        for structure, group in groups.items():
+            alignment = get_structure_alignment(answer_key, structure)
+            if alignment is None:
+                continue
+
+            question_count = len(structure)
+            choices = encode_choices(group, len(alignment))
+            scores = get_question_scores(answer_key, alignment, question_count, choices)
+            attempts[:question_count] += len(group)
+            score_sums[:question_count] += scores.sum(axis=0)
+            full_scores[:question_count] += (scores >= FULL_SCORE).sum(axis=0)
+            np.add.at(chosen, alignment, (choices == 1).sum(axis=0))
+
+    counters = {}
+    for question_index, question_id in enumerate(answer_key.question_ids):
+        counters[get_counter_field('attempts', question_id)] = int(attempts[question_index])
+        counters[get_counter_field('score', question_id)] = float(score_sums[question_index])
+        counters[get_counter_field('correct', question_id)] = int(full_scores[question_index])
+        for answer_index in answer_key.get_answer_range(question_index):
+            counters[get_counter_field('chosen', question_id, answer_key.answer_ids[answer_index])] = \
+                int(chosen[answer_index])
+
+    return counters, result_ids
+
+
+def get_rate(count, total):
+    return round(count / total * 100, 2) if total else None
+
+
+def get_answer_statistics(answer_key, question_id, answer_index, attempts, counters):
+    answer_id = answer_key.answer_ids[answer_index]
+    chosen = int(counters.get(get_counter_field('chosen', question_id, answer_id), 0))
+    return {
+        'id': answer_id,
+        'text': answer_key.answer_texts[answer_index],
+        'is_right': answer_key.answer_is_right[answer_index],
+        'chosen': chosen,
+        'chosen_rate': get_rate(chosen, attempts),
+    }
+
+
+def get_question_statistics(answer_key, counters):
+    """
+    Difficulty and distractor statistics of the quiz questions from their counters in O(questions) time.
+        :param answer_key: The current answer key of the quiz
+        :param counters: Dictionary {counter field: value} of the quiz questions
+        :return: List of per-question statistics in the quiz question order
+    """
+    statistics = []
+
+    for question_index, (question_id, question_text) in enumerate(
+            zip(answer_key.question_ids, answer_key.question_texts, strict=True)):
+        attempts = int(counters.get(get_counter_field('attempts', question_id), 0))
+        mean_score = get_rate(float(counters.get(get_counter_field('score', question_id), 0)), attempts)
+
+        statistics.append({
+            'id': question_id,
+            'question_text': question_text,
+            'attempts': attempts,
+            'correct_rate': get_rate(int(counters.get(get_counter_field('correct', question_id), 0)), attempts),
+            'mean_score': mean_score,
+            'difficulty': round(100 - mean_score, 2) if mean_score is not None else None,
+            'answers': [get_answer_statistics(answer_key, question_id, answer_index, attempts, counters)
+                        for answer_index in answer_key.get_answer_range(question_index)],
+        })
+
+    return statistics
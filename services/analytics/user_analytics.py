@@ -0,0 +1,157 @@
+from collections import defaultdict
+
+from django.db.models import Max
+
+from common.enums import InvitationStatus, QuizProgressStatus, RequestStatus
+from company.models import CompanyMember, InvitationToCompany
+from quiz.models import Quiz, UserQuizResult, UserStats
+from user.models import RequestToCompany
+
+
+def preload_user_ratings(users):
+    """
+    Preload the rating of the users from their stats.
+        :param users: The users to preload
+    """
+    stats = UserStats.objects.in_bulk({user.id for user in users}, field_name='user_id')
+    for user in users:
+        user.preloaded_rating = stats[user.id].rating if user.id in stats else None
+
+
+def preload_user_company_fields(users, company_id):
+    """
+    Preload the company fields of the users (membership, pending invitation and the last quiz result
+    in the company) with three queries.
+        :param users: The users to preload
+        :param company_id: The ID of the company from the request
+    """
+    user_ids = {user.id for user in users}
+    memberships = dict(CompanyMember.objects.filter(company_id=company_id, member_id__in=user_ids)
+                       .values_list('member_id', 'admin'))
+    invited_user_ids = set(
+        InvitationToCompany.objects.filter(company_id=company_id, recipient_id__in=user_ids,
+                                           status=InvitationStatus.PENDING.value).values_list('recipient_id', flat=True)
+    )
+    last_results = {
+        result.participant_id: result for result in UserQuizResult.objects.filter(
+            company_id=company_id, participant_id__in=user_ids
+        ).select_related('quiz').order_by('participant_id', '-updated_at').distinct('participant_id')
+    }
+
+    for user in users:
+        user.preloaded_is_company_admin = memberships.get(user.id) is True
+        user.preloaded_is_company_member = user.id in memberships
+        user.preloaded_is_active_invitation = user.id in invited_user_ids
+        last_result = last_results.get(user.id)
+        user.preloaded_last_company_quiz_for_user = {
+            'completed': last_result.progress_status == QuizProgressStatus.COMPLETED.value,
+            'quiz_title': last_result.quiz.title if last_result.quiz else None,
+            'created_at': last_result.created_at,
+            'updated_at': last_result.updated_at,
+        } if last_result else None
+
+
+def preload_user_fields(users, company_id=None):
+    """
+    Preload the serializer method fields of the users, the users with preloaded fields are skipped.
+        :param users: The users to preload
+        :param company_id: The ID of the company from the request, the company fields are not loaded if None
+    """
+    users_without_rating = [user for user in users if not hasattr(user, 'preloaded_rating')]
+    if users_without_rating:
+        preload_user_ratings(users_without_rating)
+
+    users_without_company_fields = [user for user in users if not hasattr(user, 'preloaded_is_company_member')]
+    if company_id and users_without_company_fields:
+        preload_user_company_fields(users_without_company_fields, company_id)
+
+
+def preload_company_fields(companies, auth_user):
+    """
+    Preload the serializer method fields of the companies and of their owners.
+        :param companies: The companies to preload, with selected owners
+        :param auth_user: The authenticated user of the request
+    """
+    preload_user_ratings([company.owner for company in companies])
+    if not auth_user or not auth_user.is_authenticated:
+        return
+
+    # is_admin and is_member are read from the request scoped company roles
+    requested_company_ids = set(
+        RequestToCompany.objects.filter(sender=auth_user, company_id__in={company.id for company in companies},
+                                        status=RequestStatus.PENDING.value).values_list('company_id', flat=True)
+    )
+
+    for company in companies:
+        company.preloaded_is_active_request = company.id in requested_company_ids
+
+
+def preload_quiz_fields(quizzes, auth_user):
+    """
+    Preload the serializer method fields of the quizzes and of their companies.
+        :param quizzes: The quizzes to preload, with selected companies and company owners
+        :param auth_user: The authenticated user of the request
+    """
+    quiz_ids = {quiz.id for quiz in quizzes}
+    last_completion_times = dict(
+        UserQuizResult.objects.filter(quiz_id__in=quiz_ids, progress_status=QuizProgressStatus.COMPLETED.value)
+        .values('quiz_id').annotate(last_completion_time=Max('updated_at'))
+        .values_list('quiz_id', 'last_completion_time')
+    )
+    auth_user_last_results = {}
+    if auth_user and auth_user.is_authenticated:
+        auth_user_last_results = {
+            result.quiz_id: result for result in UserQuizResult.objects.filter(
+                participant=auth_user, quiz_id__in=quiz_ids
+            ).order_by('quiz_id', '-updated_at').distinct('quiz_id')
+        }
+
+    for quiz in quizzes:
+        quiz.preloaded_last_quiz_completion_time = last_completion_times.get(quiz.id)
+        if auth_user and auth_user.is_authenticated:
+            last_result = auth_user_last_results.get(quiz.id)
+            quiz.preloaded_auth_user_last_completed = {
+                'completed': last_result.progress_status == QuizProgressStatus.COMPLETED.value,
+                'created_at': last_result.created_at,
+                'updated_at': last_result.updated_at,
+            } if last_result else None
+
+    preload_company_fields([quiz.company for quiz in quizzes], auth_user)
+
+
+def load_user_analytics(users, auth_user):
+    """
+    Load the relations of a page of users for UserAnalyticsSerializer with a fixed number of queries,
+    independent of the number of users, companies and quizzes.
+        :param users: The users of the page
+        :param auth_user: The authenticated user of the request
+    """
+    user_ids = [user.id for user in users]
+
+    quiz_results = defaultdict(list)
+    for result in UserQuizResult.objects.filter(
+        participant_id__in=user_ids, progress_status=QuizProgressStatus.COMPLETED.value
+    ).order_by('updated_at'):
+        quiz_results[result.participant_id].append(result)
+
+    companies = defaultdict(list)
+    for membership in CompanyMember.objects.filter(member_id__in=user_ids).select_related('company__owner') \
+            .order_by('company_id'):
+        companies[membership.member_id].append(membership.company)
+
+    participations = UserQuizResult.objects.filter(participant_id__in=user_ids, quiz__isnull=False) \
+        .values_list('participant_id', 'quiz_id').distinct()
+    quiz_ids_by_user = defaultdict(set)
+    for participant_id, quiz_id in participations:
+        quiz_ids_by_user[participant_id].add(quiz_id)
+    quizzes_by_id = Quiz.objects.select_related('company__owner').in_bulk(
+        {quiz_id for quiz_ids in quiz_ids_by_user.values() for quiz_id in quiz_ids}
+    )
+
+    for user in users:
+        user.preloaded_quiz_results = quiz_results[user.id]
+        user.preloaded_companies = companies[user.id]
+        user.preloaded_quizzes = [quizzes_by_id[quiz_id] for quiz_id in sorted(quiz_ids_by_user[user.id])]
+
+    preload_company_fields([company for user in users for company in user.preloaded_companies], auth_user)
+    preload_quiz_fields(list(quizzes_by_id.values()), auth_user)
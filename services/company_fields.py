@@ -0,0 +1,21 @@
+from django.db.models import Exists, OuterRef
+
+from common.enums import RequestStatus
+from user.models import RequestToCompany
+
+
+def annotate_company_fields(queryset, auth_user):
+    """
+    Annotate a company queryset with the fields read by CompanySerializer, so a page of companies
+    is serialized without per-company queries. is_admin and is_member are read from the company roles cache.
+        :param queryset: A queryset of companies
+        :param auth_user: The authenticated user of the request
+        :return: The queryset with the selected owners and the annotated fields of the user
+    """
+    queryset = queryset.select_related('owner')
+    if not auth_user or not auth_user.is_authenticated:
+        return queryset
+
+    return queryset.annotate(preloaded_is_active_request=Exists(RequestToCompany.objects.filter(
+        company_id=OuterRef('pk'), sender=auth_user, status=RequestStatus.PENDING.value,
+    )))
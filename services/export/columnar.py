@@ -0,0 +1,128 @@
+import tempfile
+from datetime import timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.http import FileResponse
+from openpyxl import Workbook
+
+from helios_backend.settings import EXPORT_CHUNK_SIZE
+
+from .converters import create_response
+from .projections import get_score, iter_export_rows
+
+EXPORT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('participant', pa.string()),
+    ('company', pa.string()),
+    ('quiz', pa.string()),
+    ('correct_answers', pa.float64()),
+    ('total_questions', pa.int64()),
+    ('date_passed', pa.timestamp('us', tz='UTC')),
+    ('quiz_time', pa.duration('us')),
+    ('user_rating', pa.decimal128(5, 2)),
+    ('score', pa.float64()),
+])
+
+
+class ChunkedSink:
+    """
+    Write-only file object that keeps the written bytes until they are taken, the position grows with every write.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_record_batches(queryset):
+    """
+    Method for building typed record batches of the quiz results.
+        :param queryset: The quiz results queryset
+        :return: A generator of record batches with the EXPORT_SCHEMA schema
+    """
+    rows = []
+    for row in iter_export_rows(queryset):
+        rows.append(row)
+        if len(rows) == EXPORT_CHUNK_SIZE:
+            yield get_record_batch(rows)
+            rows = []
+
+    if rows:
+        yield get_record_batch(rows)
+
+
+def get_record_batch(rows):
+    columns = list(zip(*rows, strict=True))
+    columns.append([get_score(row[4], row[5]) for row in rows])
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, EXPORT_SCHEMA, strict=True)],
+        schema=EXPORT_SCHEMA,
+    )
+
+
+def iter_file_content(queryset, get_writer):
+    """
+    Method for writing the record batches of the quiz results and yielding the file content as it is written.
+        :param queryset: The quiz results queryset
+        :param get_writer: A function returning a batch writer for the given sink and schema
+        :return: A generator of file content chunks
+    """
+    sink = ChunkedSink()
+    with get_writer(pa.PythonFile(sink, mode='w'), EXPORT_SCHEMA) as writer:
+        for record_batch in iter_record_batches(queryset):
+            writer.write_batch(record_batch)
+            yield sink.take()
+    yield sink.take()
+
+
+def queryset_to_parquet(queryset):
+    return create_response(iter_file_content(queryset, pq.ParquetWriter), 'parquet', 'application/vnd.apache.parquet')
+
+
+def queryset_to_arrow(queryset):
+    return create_response(iter_file_content(queryset, pa.ipc.new_file), 'arrow', 'application/vnd.apache.arrow.file')
+
+
+def queryset_to_xlsx(queryset):
+    # a write-only workbook keeps only the current row in memory, the file is removed when the response is closed
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('quiz_results')
+    worksheet.append([field.name for field in EXPORT_SCHEMA])
+
+    for row in iter_export_rows(queryset):
+        row = list(row)
+        # Excel does not support time zones
+        row[6] = row[6].astimezone(timezone.utc).replace(tzinfo=None)
+        row.append(get_score(row[4], row[5]))
+        worksheet.append(row)
+
+    file = tempfile.TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename='quiz_results.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -1,37 +1,58 @@
 import csv
 import json
-import tempfile
 from decimal import Decimal
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
 
+from .projections import get_score, iter_export_rows
 
-def create_response(file, format_file, content_type):
-    with open(file.name, 'rb') as file_data:
-        response = HttpResponse(file_data.read(), content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="quiz_results.{format_file}"'
+CSV_HEADER = ['id', 'participant', 'company', 'quiz', 'score', 'date passed', 'quiz_time', 'user_rating']
+
+
+class Echo:
+    """
+    File-like object that returns the written value instead of storing it, so the csv writer can produce lines lazily.
+    """
+    def write(self, value):
+        return value
+
+
+def create_response(content, format_file, content_type):
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="quiz_results.{format_file}"'
 
     return response
 
 
-def data_to_json(data):
-    with tempfile.NamedTemporaryFile(delete=False, mode='w', suffix='.json') as file:
-        json.dump(data, file, default=str)
+def iter_json(data):
+    yield '['
+    for index, item in enumerate(data):
+        yield f'{", " if index else ""}{json.dumps(item, default=str)}'
+    yield ']'
+
 
-    return create_response(file, 'json', 'application/json')
+def iter_csv(queryset):
+    writer = csv.writer(Echo())
+    date_field = serializers.DateTimeField()
+    duration_field = serializers.DurationField()
 
+    yield writer.writerow(CSV_HEADER)
+    for (result_id, username, company_name, quiz_title, correct_answers, total_questions, updated_at, quiz_time,
+         user_rating) in iter_export_rows(queryset):
+        score = get_score(correct_answers, total_questions)
+        if score is not None:
+            score = Decimal(score).quantize(Decimal('1.00'))
 
-def data_to_csv(data):
-    with tempfile.NamedTemporaryFile(delete=False, mode='w', newline='', suffix='.csv') as file:
-        writer = csv.writer(file)
+        yield writer.writerow([
+             result_id, username, company_name, quiz_title, score, date_field.to_representation(updated_at),
+             duration_field.to_representation(quiz_time), user_rating
+        ])
 
-        writer.writerow(['id', 'participant', 'company', 'quiz', 'score', 'date passed', 'quiz_time', 'user_rating'])
-        for item in data:
-            score = Decimal(item['correct_answers'] / item['total_questions'] * 100).quantize(Decimal('1.00'))
 
-            writer.writerow([
-                 item['id'], item['participant']['username'], item['company']['name'], item['quiz']['title'], score,
-                 item['updated_at'], item['quiz_time'], item['user_rating']
-            ])
+def data_to_json(data):
+    return create_response(iter_json(data), 'json', 'application/json')
+
 
-    return create_response(file, 'csv', 'text/csv')
+def queryset_to_csv(queryset):
+    return create_response(iter_csv(queryset), 'csv', 'text/csv')
@@ -0,0 +1,28 @@
+from helios_backend.settings import EXPORT_CHUNK_SIZE
+
+# (column name, lookup) pairs of the exported quiz results
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('participant', 'participant__username'),
+    ('company', 'company__name'),
+    ('quiz', 'quiz__title'),
+    ('correct_answers', 'correct_answers'),
+    ('total_questions', 'total_questions'),
+    ('date_passed', 'updated_at'),
+    ('quiz_time', 'quiz_time'),
+    ('user_rating', 'user_rating'),
+)
+
+
+def iter_export_rows(queryset):
+    """
+    Method for loading the flat export columns of the quiz results with a single joined query,
+    the rows are fetched in chunks of EXPORT_CHUNK_SIZE.
+        :param queryset: The quiz results queryset
+        :return: A generator of row tuples in the EXPORT_COLUMNS order
+    """
+    return queryset.values_list(*(lookup for _name, lookup in EXPORT_COLUMNS)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def get_score(correct_answers, total_questions):
+    return correct_answers / total_questions * 100 if total_questions else None
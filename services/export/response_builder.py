@@ -1,11 +1,18 @@
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
 
-from .converters import data_to_csv, data_to_json
+from .columnar import queryset_to_arrow, queryset_to_parquet, queryset_to_xlsx
+from .converters import data_to_json, queryset_to_csv
 
 FILE_FORMAT_HANDLERS = {
     'json': data_to_json,
-    'csv': data_to_csv,
+}
+# the formats built from the typed columns of the queryset instead of the serialized data
+QUERYSET_FORMAT_HANDLERS = {
+    'csv': queryset_to_csv,
+    'parquet': queryset_to_parquet,
+    'arrow': queryset_to_arrow,
+    'xlsx': queryset_to_xlsx,
 }
 
 
@@ -14,3 +21,7 @@ def convert_data_to_file(data, format_file):
         raise ValidationError({'message': _('This format is not supported.')})
 
     return FILE_FORMAT_HANDLERS[format_file](data)
+
+
+def convert_queryset_to_file(queryset, format_file):
+    return QUERYSET_FORMAT_HANDLERS[format_file](queryset)
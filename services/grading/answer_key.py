@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+
+
+@dataclass(frozen=True, slots=True)
+class QuizAnswerKey:
+    """
+    Immutable, precompiled answer key of a quiz version.
+
+    Answers of all questions are stored in flat tuples, the answers of the question with index i
+    are located in the range answer_offsets[i]:answer_offsets[i + 1].
+
+    Attributes:
+        quiz_id (int): The ID of the quiz.
+        version (float): The quiz version (timestamp of the last quiz change).
+        question_ids (tuple): IDs of the quiz questions.
+        question_texts (tuple): Texts of the quiz questions.
+        answer_offsets (tuple): Offsets of the question answers in the flat answer tuples.
+        answer_ids (tuple): IDs of the answers.
+        answer_texts (tuple): Texts of the answers.
+        answer_is_right (tuple): Correctness flags of the answers.
+    """
+    quiz_id: int
+    version: float
+    question_ids: tuple[int, ...]
+    question_texts: tuple[str, ...]
+    answer_offsets: tuple[int, ...]
+    answer_ids: tuple[int, ...]
+    answer_texts: tuple[str, ...]
+    answer_is_right: tuple[bool, ...]
+
+    @classmethod
+    def from_quiz(cls, quiz):
+        """
+        Compile the answer key of a quiz with two database queries.
+        Args:
+            quiz (Quiz): The quiz to compile.
+        Returns:
+            QuizAnswerKey: The compiled answer key.
+        """
+        from quiz.models import Answer
+
+        questions = list(quiz.questions.order_by('id').values_list('id', 'question_text'))
+        answers_by_question = {question_id: [] for question_id, _question_text in questions}
+
+        answers = Answer.question.through.objects.filter(question__quiz=quiz) \
+            .order_by('question_id', 'answer_id') \
+            .values_list('question_id', 'answer_id', 'answer__text', 'answer__is_right')
+        for question_id, answer_id, text, is_right in answers:
+            answers_by_question[question_id].append((answer_id, text, is_right))
+
+        answer_offsets = [0]
+        answer_rows = []
+        for question_id, _question_text in questions:
+            answer_rows.extend(answers_by_question[question_id])
+            answer_offsets.append(len(answer_rows))
+
+        return cls(
+            quiz_id=quiz.id,
+            version=quiz.updated_at.timestamp(),
+            question_ids=tuple(question_id for question_id, _question_text in questions),
+            question_texts=tuple(question_text for _question_id, question_text in questions),
+            answer_offsets=tuple(answer_offsets),
+            answer_ids=tuple(answer_id for answer_id, _text, _is_right in answer_rows),
+            answer_texts=tuple(text for _answer_id, text, _is_right in answer_rows),
+            answer_is_right=tuple(is_right for _answer_id, _text, is_right in answer_rows),
+        )
+
+    @property
+    def total_questions(self):
+        return len(self.question_ids)
+
+    def get_answer_range(self, question_index):
+        return range(self.answer_offsets[question_index], self.answer_offsets[question_index + 1])
+
+    def get_count_correct_answers(self, user_responses):
+        """
+        Grade the user responses without database queries.
+        Args:
+            user_responses (dict): User responses to the quiz questions.
+        Returns:
+            float: The number of correctly answered questions.
+        Raises:
+            ValidationError: If the questions or answers of the responses do not match the quiz.
+        """
+        return sum(self.get_question_scores(user_responses))
+
+    def get_question_scores(self, user_responses):
+        """
+        Grade each answered question of the user responses without database queries.
+        Args:
+            user_responses (dict): User responses to the quiz questions.
+        Returns:
+            list: The scores between 0 and 1 of the answered questions in the quiz question order.
+        Raises:
+            ValidationError: If the questions or answers of the responses do not match the quiz.
+        """
+        question_scores = []
+
+        for question_index, user_question in zip(range(self.total_questions), user_responses.get('questions'),
+                                                 strict=False):
+            answer_range = self.get_answer_range(question_index)
+            total_answers = len(answer_range)
+            if total_answers != len(user_question.get('answers')) \
+                    or self.question_texts[question_index] != user_question.get('question_text'):
+                raise ValidationError(_('Question mismatch'))
+
+            correct_answer = 0
+            for answer_index, user_answer in zip(answer_range, user_question.get('answers'), strict=False):
+                if self.answer_texts[answer_index] != user_answer.get('text'):
+                    raise ValidationError(_('Answer mismatch'))
+
+                if self.answer_is_right[answer_index] == user_answer.get('is_right'):
+                    correct_answer += 1
+                else:
+                    correct_answer -= 1
+
+            question_scores.append(correct_answer/total_answers if correct_answer > 0 else 0)
+
+        return question_scores
+
+    def get_response_rows(self, user_responses):
+        """
+        Get a compact copy of the graded part of the user responses for storage.
+        Args:
+            user_responses (dict): User responses to the quiz questions.
+        Returns:
+            list: List of [question text, [[answer text, user choice], ...]] items.
+        """
+        return [
+            [
+                user_question.get('question_text'),
+                [[user_answer.get('text'), user_answer.get('is_right')]
+                 for user_answer in user_question.get('answers')],
+            ]
+            for _question_index, user_question
+            in zip(range(self.total_questions), user_responses.get('questions'), strict=False)
+        ]
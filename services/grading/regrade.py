@@ -0,0 +1,296 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+
+from common.cache.leaderboards import update_participants_leaderboards
+from common.enums import QuizProgressStatus
+from services.analytics.rollups import rebuild_quiz_daily_stats, rebuild_user_stats
+from services.grading.answer_key import QuizAnswerKey
+
+REGRADE_BATCH_SIZE = 5000
+REGRADE_PARTICIPANTS_BATCH_SIZE = 1000
+# differences of the float scores below this value are rounding noise
+SCORE_TOLERANCE = 1e-9
+
+
+def get_response_structure(response_rows):
+    return tuple((question_text, tuple(text for text, _choice in answers)) for question_text, answers in response_rows)
+
+
+def encode_choice(choice):
+    # the user choice is compared with the is_right flag by equality, unknown values never match
+    return int(choice) if choice in (True, False) else -1
+
+
+def encode_choices(responses, answer_count):
+    """
+    Matrix of encoded user choices of responses with the same structure, one row per response.
+    """
+    return np.array(
+        [[encode_choice(choice) for _question_text, answers in response_rows for _text, choice in answers]
+         for response_rows in responses],
+        dtype=np.int8,
+    ).reshape(len(responses), answer_count)
+
+
+def get_structure_alignment(answer_key, structure):
+    """
+    Map the stored answers of a response structure to the answers of the answer key.
+    Answers are matched by question position and answer text, so reordered answers are still matched.
+    Args:
+        answer_key (QuizAnswerKey): The current answer key of the quiz.
+        structure (tuple): The response structure ((question text, (answer text, ...)), ...).
+    Returns:
+        list | None: Flat answer key indices in the stored answer order or None if the structure does not match.
+    """
+    alignment = []
+
+    for question_index, (question_text, answer_texts) in enumerate(structure):
+        if question_index >= answer_key.total_questions or answer_key.question_texts[question_index] != question_text:
+            return None
+
+        answer_range = answer_key.get_answer_range(question_index)
+        if len(answer_range) != len(answer_texts):
+            return None
+
+        key_positions = defaultdict(list)
+        for answer_index in answer_range:
+            key_positions[answer_key.answer_texts[answer_index]].append(answer_index)
+
+        for text in answer_texts:
+            if not key_positions.get(text):
+                return None
+            alignment.append(key_positions[text].pop(0))
+
+    return alignment
+
+
+def get_question_scores(answer_key, alignment, question_count, choices):
+    """
+    Grade each question of a matrix of user choices with the same response structure.
+    Args:
+        answer_key (QuizAnswerKey): The current answer key of the quiz.
+        alignment (list): Flat answer key indices of the stored answers.
+        question_count (int): The number of answered questions.
+        choices (np.ndarray): Matrix of encoded user choices, one row per result.
+    Returns:
+        np.ndarray: Matrix of question scores between 0 and 1, one row per result and one column per question.
+    """
+    offsets = np.asarray(answer_key.answer_offsets[:question_count + 1])
+    is_right = np.asarray(answer_key.answer_is_right, dtype=np.int8)[alignment]
+
+    # +1 for each matching answer and -1 for each mismatching one, summed per question
+    answer_points = np.where(choices == is_right, 1, -1)
+    cumulative_points = np.concatenate(
+        (np.zeros((choices.shape[0], 1), dtype=np.int64), np.cumsum(answer_points, axis=1)), axis=1
+    )
+    question_points = cumulative_points[:, offsets[1:]] - cumulative_points[:, offsets[:-1]]
+    total_answers = np.diff(offsets)
+
+    return np.divide(question_points, total_answers, out=np.zeros(question_points.shape), where=question_points > 0)
+
+
+def grade_choices(answer_key, alignment, question_count, choices):
+    """
+    Grade a matrix of user choices with the same response structure.
+    Args:
+        answer_key (QuizAnswerKey): The current answer key of the quiz.
+        alignment (list): Flat answer key indices of the stored answers.
+        question_count (int): The number of answered questions.
+        choices (np.ndarray): Matrix of encoded user choices, one row per result.
+    Returns:
+        np.ndarray: The number of correctly answered questions of each result.
+    """
+    return get_question_scores(answer_key, alignment, question_count, choices).sum(axis=1)
+
+
+def get_correct_answers_deltas(answer_key, results):
+    """
+    Regrade a batch of stored responses and get the changes of the correct answers.
+    Args:
+        answer_key (QuizAnswerKey): The current answer key of the quiz.
+        results (list): List of (id, correct answers, responses) tuples.
+    Returns:
+        tuple: Dictionary {result id: correct answers delta} and the number of skipped results.
+    """
+    groups = defaultdict(list)
+    for result_id, correct_answers, response_rows in results:
+        groups[get_response_structure(response_rows)].append((result_id, correct_answers, response_rows))
+
+    deltas = {}
+    skipped = 0
+    for structure, group in groups.items():
+        alignment = get_structure_alignment(answer_key, structure)
+        if alignment is None:
+            skipped += len(group)
+            continue
+
+        choices = encode_choices([response_rows for _result_id, _correct_answers, response_rows in group],
+                                 len(alignment))
+        new_correct_answers = grade_choices(answer_key, alignment, len(structure), choices)
+        old_correct_answers = np.array([correct_answers for _result_id, correct_answers, _rows in group])
+
+        changed = np.abs(new_correct_answers - old_correct_answers) > SCORE_TOLERANCE
+        for index in np.flatnonzero(changed):
+            deltas[group[index][0]] = float(new_correct_answers[index] - old_correct_answers[index])
+
+    return deltas, skipped
+
+
+def get_group_cumsum(values, *group_keys):
+    """
+    Cumulative sums of values restarted at every new group, the values must be sorted by the group keys.
+    """
+    cumulative = np.cumsum(values)
+    if not len(values):
+        return cumulative
+
+    is_group_start = np.zeros(len(values), dtype=bool)
+    is_group_start[0] = True
+    for group_key in group_keys:
+        is_group_start[1:] |= group_key[1:] != group_key[:-1]
+
+    group_starts = np.flatnonzero(is_group_start)
+    group_sizes = np.diff(np.r_[group_starts, len(values)])
+    group_offsets = np.repeat(cumulative[group_starts] - values[group_starts], group_sizes)
+    return cumulative - group_offsets
+
+
+def iter_batches(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_percentage(correct, total, default):
+    if total > 0:
+        return Decimal((correct / total) * 100).quantize(Decimal('1.00'))
+    return default
+
+
+def apply_correct_answers_deltas(participant_ids, deltas, batch_size=REGRADE_BATCH_SIZE):
+    """
+    Save the regraded results of the participants and carry the changes forward into the collector fields,
+    the user rating and the company average score of all their later results.
+    Args:
+        participant_ids (list): IDs of the participants whose results were changed.
+        deltas (dict): Dictionary {result id: correct answers delta}.
+        batch_size (int): The number of rows per bulk update query.
+    Returns:
+        int: The number of updated results.
+    """
+    from quiz.models import UserQuizResult
+
+    rows = list(
+        UserQuizResult.objects.filter(
+            participant_id__in=participant_ids,
+            progress_status=QuizProgressStatus.COMPLETED.value,
+        ).order_by('participant_id', 'updated_at', 'id').values_list(
+            'id', 'participant_id', 'company_id', 'correct_answers', 'correct_answers_collector',
+            'total_questions_collector', 'correct_company_answers_collector', 'total_company_questions_collector',
+            'user_rating', 'company_average_score',
+        )
+    )
+
+    row_participant_ids = np.array([row[1] for row in rows], dtype=np.int64)
+    row_company_ids = np.array([row[2] if row[2] is not None else -1 for row in rows], dtype=np.int64)
+    row_deltas = np.array([deltas.get(row[0], 0.0) for row in rows])
+
+    # the collectors are running totals, so every later row of the participant shifts by the accumulated delta
+    collector_deltas = get_group_cumsum(row_deltas, row_participant_ids)
+
+    # a stable sort keeps the time order of the results inside each (participant, company) group
+    company_order = np.lexsort((np.arange(len(rows)), row_company_ids, row_participant_ids))
+    company_collector_deltas = np.empty(len(rows))
+    company_collector_deltas[company_order] = get_group_cumsum(
+        row_deltas[company_order], row_participant_ids[company_order], row_company_ids[company_order])
+
+    changed = np.flatnonzero(
+        (row_deltas != 0)
+        | (np.abs(collector_deltas) > SCORE_TOLERANCE)
+        | (np.abs(company_collector_deltas) > SCORE_TOLERANCE)
+    )
+    updated_results = []
+    for index in changed.tolist():
+        (result_id, _participant_id, _company_id, correct_answers, correct_answers_collector,
+         total_questions_collector, correct_company_answers_collector, total_company_questions_collector,
+         user_rating, company_average_score) = rows[index]
+
+        result = UserQuizResult(id=result_id)
+        result.correct_answers = correct_answers + row_deltas[index]
+        result.correct_answers_collector = correct_answers_collector + collector_deltas[index]
+        result.correct_company_answers_collector = \
+            correct_company_answers_collector + company_collector_deltas[index]
+        result.user_rating = get_percentage(result.correct_answers_collector, total_questions_collector, user_rating)
+        result.company_average_score = get_percentage(
+            result.correct_company_answers_collector, total_company_questions_collector, company_average_score)
+        updated_results.append(result)
+
+    UserQuizResult.objects.bulk_update(
+        updated_results,
+        fields=('correct_answers', 'correct_answers_collector', 'correct_company_answers_collector', 'user_rating',
+                'company_average_score'),
+        batch_size=batch_size,
+    )
+
+    return len(updated_results)
+
+
+def regrade_quiz_results(quiz_id, batch_size=REGRADE_BATCH_SIZE):
+    """
+    Regrade all completed results of a quiz with its current answer key.
+    Results without stored responses or with responses that no longer match the quiz structure are skipped.
+    Args:
+        quiz_id (int): The ID of the quiz.
+        batch_size (int): The number of results loaded and updated per batch.
+    Returns:
+        dict: The number of regraded, updated and skipped results.
+    """
+    from common.cache.statistics import bump_statistics_versions
+    from quiz.models import Quiz, UserQuizResult
+
+    quiz = Quiz.objects.get(id=quiz_id)
+    answer_key = QuizAnswerKey.from_quiz(quiz)
+
+    results = UserQuizResult.objects.filter(
+        quiz_id=quiz_id,
+        participant__isnull=False,
+        progress_status=QuizProgressStatus.COMPLETED.value,
+        responses__isnull=False,
+    ).values_list('id', 'participant_id', 'correct_answers', 'responses').iterator(chunk_size=batch_size)
+
+    deltas = {}
+    participant_ids = set()
+    regraded = skipped = 0
+    for batch in iter_batches(results, batch_size):
+        batch_deltas, batch_skipped = get_correct_answers_deltas(
+            answer_key, [(result_id, correct_answers, responses)
+                         for result_id, _participant_id, correct_answers, responses in batch]
+        )
+        deltas.update(batch_deltas)
+        participant_ids.update(participant_id for result_id, participant_id, _correct_answers, _responses in batch
+                               if result_id in batch_deltas)
+        regraded += len(batch) - batch_skipped
+        skipped += batch_skipped
+
+    # the results of a participant depend only on each other, so participants are processed in independent chunks
+    updated = 0
+    for participant_ids_batch in iter_batches(sorted(participant_ids), REGRADE_PARTICIPANTS_BATCH_SIZE):
+        updated += apply_correct_answers_deltas(participant_ids_batch, deltas, batch_size=batch_size)
+
+    if updated:
+        rebuild_quiz_daily_stats([quiz_id])
+        rebuild_user_stats(sorted(participant_ids))
+        update_participants_leaderboards(sorted(participant_ids))
+        # the regraded results keep their timestamps, so the cached statistics are invalidated explicitly
+        bump_statistics_versions(quiz_ids=[quiz_id], company_ids=[quiz.company_id])
+
+    logging.info(f'Quiz {quiz_id} regraded: {regraded} results regraded, {updated} updated, {skipped} skipped')
+    return {'regraded': regraded, 'updated': updated, 'skipped': skipped}
@@ -1,15 +1,23 @@
 from django.utils.translation import gettext_lazy as _
 from rest_framework.exceptions import ValidationError
 
-from .parsers import parse_excel
+from .parsers import parse_csv, parse_excel, parse_ndjson
 
 FILE_FORMAT_HANDLERS = {
     'xls': parse_excel,
     'xlsx': parse_excel,
+    'csv': parse_csv,
+    'ndjson': parse_ndjson,
+    'jsonl': parse_ndjson,
 }
 
 
 def convert_file_to_data(file):
+    """
+    Method for converting a quiz file to quiz data.
+        :param file: The uploaded file
+        :return: An iterator of the quiz data, the file is parsed lazily while the iterator is consumed
+    """
     ext = file.name.strip().split('.')[-1]
     if not FILE_FORMAT_HANDLERS.get(ext):
         raise ValidationError({'message': _('This format is not supported.')})
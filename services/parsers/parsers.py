@@ -1,26 +1,143 @@
+import csv
+import json
+
+from django.utils.translation import gettext_lazy as _
 from openpyxl import load_workbook
+from rest_framework.exceptions import ValidationError
+
+QUIZ_HEADER_FIELDS = ('title', 'description', 'frequency')
+QUIZ_HEADER_ROWS = len(QUIZ_HEADER_FIELDS)
+QUIZ_ROW_SIZE = 3
+# the first header row of a quiz, it separates the quizzes of flat files
+QUIZ_START_FIELD = QUIZ_HEADER_FIELDS[0]
+
+
+def clean_rows(rows):
+    """
+    Method for bringing the rows of all file formats to the same layout.
+    Empty values are replaced with None, rows are padded to QUIZ_ROW_SIZE values and empty rows are skipped.
+        :param rows: An iterable of row value sequences
+        :return: A generator of row value tuples
+    """
+    for row in rows:
+        values = [None if value == '' else value for value in row[:QUIZ_ROW_SIZE]]
+        if any(value is not None for value in values):
+            yield (*values, *([None] * (QUIZ_ROW_SIZE - len(values))))
+
+
+def parse_quiz_rows(rows, first_row_number=1, ordered_header=True):
+    """
+    Method for building the quiz data from the rows of a quiz file.
+    The first QUIZ_HEADER_ROWS rows contain the (field, value) pairs of the quiz starting with QUIZ_START_FIELD,
+    they are followed by ('question', text) rows, each one followed by its ('answer', text, 'true' | 'false') rows.
+        :param rows: An iterable of row value tuples
+        :param first_row_number: The number of the first row in the file, empty rows are not counted
+        :param ordered_header: Whether the header rows must start with QUIZ_START_FIELD
+        :return: The quiz data with the list of questions
+    """
+    quiz_data = {}
+    questions_data = []
+    question = None
+    row_index = -1
+
+    for row_index, row in enumerate(rows):
+        if row_index < QUIZ_HEADER_ROWS:
+            if row[0] not in QUIZ_HEADER_FIELDS or row[0] in quiz_data \
+                    or (ordered_header and row_index == 0 and row[0] != QUIZ_START_FIELD):
+                raise ValidationError({'message': _('Row {} must be a quiz header row, a quiz starts with the {} rows')
+                                       .format(first_row_number + row_index, ', '.join(QUIZ_HEADER_FIELDS))})
+            quiz_data[row[0]] = row[1]
+        elif row[0] == 'question':
+            question = {'question_text': row[1], 'answers': []}
+            questions_data.append(question)
+        elif row[0] == 'answer' and question is not None:
+            question['answers'].append({'text': row[1], 'is_right': row[2] in ('true', True)})
+        else:
+            raise ValidationError({'message': _('Row {} must be a question or an answer of a question')
+                                   .format(first_row_number + row_index)})
+
+    if row_index < QUIZ_HEADER_ROWS - 1:
+        raise ValidationError({'message': _('The quiz starting on row {} must start with the {} rows')
+                               .format(first_row_number, ', '.join(QUIZ_HEADER_FIELDS))})
+
+    quiz_data['questions'] = questions_data
+    return quiz_data
+
+
+def parse_quiz_row_stream(rows):
+    """
+    Method for streaming the quizzes of a flat file, every quiz starts with its QUIZ_START_FIELD row.
+    The header rows of every quiz are validated, so a quiz with reordered header rows is not mis-split.
+        :param rows: An iterable of row value tuples
+        :return: A generator of the quiz data
+    """
+    quiz_rows = []
+    first_row_number = 1
+    for row_number, row in enumerate(rows, start=1):
+        if row[0] == QUIZ_START_FIELD and quiz_rows:
+            yield parse_quiz_rows(quiz_rows, first_row_number)
+            quiz_rows = []
+            first_row_number = row_number
+        quiz_rows.append(row)
+
+    if quiz_rows:
+        yield parse_quiz_rows(quiz_rows, first_row_number)
 
 
 def parse_excel(file):
-    data = []
-    workbook = load_workbook(file)
-    for worksheet in workbook.worksheets:
-        sheet_data = {}
-        questions_data = []
-        question = None
-
-        for row_index, row in enumerate(worksheet.rows):
-            if row_index < 3:
-                sheet_data[row[0].internal_value] = row[1].internal_value
-            elif row[0].internal_value == 'question':
-                if question:
-                    questions_data.append(question)
-                question = {'question_text': row[1].internal_value, 'answers': []}
-            else:
-                question['answers'].append({'text': row[1].internal_value, 'is_right': row[2].internal_value == 'true'})
-
-        questions_data.append(question)
-        sheet_data['questions'] = questions_data
-        data.append(sheet_data)
-
-    return data
+    """
+    Method for streaming the quizzes of an Excel file, one quiz per worksheet.
+    The worksheets separate the quizzes, so their header rows may come in any order.
+    The workbook is opened in read-only mode, so only the rows of the current worksheet are kept in memory.
+        :param file: The Excel file
+        :return: A generator of the quiz data of every worksheet
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            yield parse_quiz_rows(clean_rows(worksheet.iter_rows(max_col=QUIZ_ROW_SIZE, values_only=True)),
+                                  ordered_header=False)
+    finally:
+        workbook.close()
+
+
+def read_csv_lines(file):
+    for line_number, line in enumerate(file, start=1):
+        try:
+            yield line.decode('utf-8-sig')
+        except UnicodeDecodeError as error:
+            raise ValidationError({'message': _('Line {} is not UTF-8 encoded text').format(line_number)}) from error
+
+
+def parse_csv(file):
+    """
+    Method for streaming the quizzes of a CSV file, the file is read line by line.
+        :param file: The CSV file
+        :return: A generator of the quiz data
+    """
+    yield from parse_quiz_row_stream(clean_rows(csv.reader(read_csv_lines(file))))
+
+
+def read_ndjson_rows(file):
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            raise ValidationError({'message': _('Invalid JSON on line {}').format(line_number)}) from error
+        if not isinstance(row, list):
+            raise ValidationError({'message': _('Line {} must contain a list of values').format(line_number)})
+
+        yield row
+
+
+def parse_ndjson(file):
+    """
+    Method for streaming the quizzes of a newline delimited JSON file, every line contains the values of one row.
+        :param file: The NDJSON file
+        :return: A generator of the quiz data
+    """
+    yield from parse_quiz_row_stream(clean_rows(read_ndjson_rows(file)))
+
@@ -0,0 +1,115 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from common.enums import QuizImportStatus
+from helios_backend.settings import QUIZ_IMPORT_CHUNK_SIZE
+from quiz.models import QuizImportJob
+from services.parsers.converter import convert_file_to_data
+
+
+def send_import_progress(job, imported_quizzes):
+    """
+    Method for sending the progress of an import job to the websocket group of the user who created it.
+        :param job: The import job
+        :param imported_quizzes: The number of quizzes imported so far
+    """
+    if job.created_by_id is None:
+        return
+
+    async_to_sync(get_channel_layer().group_send)(
+        f'user_{job.created_by_id}',
+        {
+            'type': 'send_import_progress',
+            'id': job.id,
+            'status': job.status,
+            'processed_sheets': job.processed_sheets,
+            'imported_quizzes': imported_quizzes,
+            'errors': job.errors,
+        },
+    )
+
+
+def import_quiz_sheets(job, sheets):
+    """
+    Method for validating and inserting a chunk of sheets in one transaction.
+    Invalid sheets are skipped and their errors are stored in the job once the chunk is committed.
+        :param job: The import job
+        :param sheets: A list of (sheet number, quiz data) pairs
+        :return: The number of imported quizzes
+    """
+    from quiz.serializers import QuizDetailSerializer
+
+    quizzes = []
+    errors = []
+
+    with transaction.atomic():
+        for sheet_number, quiz_data in sheets:
+            serializer = QuizDetailSerializer(data=quiz_data)
+            if not serializer.is_valid():
+                errors.append({'sheet': sheet_number, 'errors': serializer.errors})
+                continue
+            quizzes.append(serializer.create_quiz(job.company, serializer.validated_data))
+
+        job.quizzes.add(*quizzes)
+        QuizImportJob.objects.filter(id=job.id).update(
+            processed_sheets=job.processed_sheets + len(sheets),
+            errors=job.errors + errors,
+            updated_at=timezone.now(),
+        )
+
+    # the in-memory job is changed only after the chunk is committed, a rolled back chunk leaves it unchanged
+    job.processed_sheets += len(sheets)
+    job.errors.extend(errors)
+
+    return len(quizzes)
+
+
+def import_quizzes(job_id):
+    """
+    Method for importing the quizzes of an uploaded file, one quiz per sheet.
+    The file is parsed lazily and the sheets are inserted in chunks of QUIZ_IMPORT_CHUNK_SIZE sheets
+    per transaction, the progress is reported after every chunk.
+        :param job_id: The ID of the import job
+    """
+    # the job is claimed by a single conditional UPDATE, a redelivered task finds it already claimed
+    claimed = QuizImportJob.objects.filter(id=job_id, status=QuizImportStatus.PENDING.value).update(
+        status=QuizImportStatus.PROCESSING.value,
+        updated_at=timezone.now(),
+    )
+    if not claimed:
+        return
+
+    job = QuizImportJob.objects.select_related('company').get(id=job_id)
+    imported_quizzes = 0
+    send_import_progress(job, imported_quizzes)
+
+    try:
+        with job.file.open('rb') as file:
+            sheets = []
+            for sheet_number, quiz_data in enumerate(convert_file_to_data(file), start=1):
+                sheets.append((sheet_number, quiz_data))
+                if len(sheets) == QUIZ_IMPORT_CHUNK_SIZE:
+                    imported_quizzes += import_quiz_sheets(job, sheets)
+                    send_import_progress(job, imported_quizzes)
+                    sheets = []
+            if sheets:
+                imported_quizzes += import_quiz_sheets(job, sheets)
+    except Exception as error:
+        logging.exception(f'Quiz import {job.id} failed')
+        job.status = QuizImportStatus.FAILED.value
+        if isinstance(error, ValidationError):
+            job.errors.append(error.detail if isinstance(error.detail, dict) else {'message': error.detail})
+        else:
+            job.errors.append({'message': str(error)})
+    else:
+        job.status = QuizImportStatus.COMPLETED.value
+
+    # the uploaded file is no longer needed once the sheets are imported
+    job.file.delete(save=False)
+    job.save(update_fields=('status', 'errors', 'file', 'updated_at'))
+    send_import_progress(job, imported_quizzes)
@@ -0,0 +1,102 @@
+from collections import defaultdict
+
+from django.utils import timezone
+
+from quiz.models import Answer, Question
+from quiz.signals import suspend_quiz_version_signals
+
+QuestionAnswer = Answer.question.through
+
+
+def get_question_changes(quiz, existing_questions, questions_data):
+    """
+    Compare the question payloads with the existing questions of a quiz.
+        :param quiz: The quiz to synchronize
+        :param existing_questions: Dictionary {question ID: question text} of the existing questions
+        :param questions_data: List of validated question payloads
+        :return: The questions in the payload order, the new, the updated and the removed question IDs
+    """
+    unused_questions = dict(existing_questions)
+    now = timezone.now()
+    questions = []
+    new_questions = []
+    updated_questions = []
+
+    for question_data in questions_data:
+        question_id = question_data.get('id')
+        if question_id in unused_questions:
+            question = Question(id=question_id, quiz=quiz, question_text=question_data['question_text'])
+            if unused_questions.pop(question_id) != question.question_text:
+                question.updated_at = now
+                updated_questions.append(question)
+        else:
+            question = Question(quiz=quiz, question_text=question_data['question_text'])
+            new_questions.append(question)
+        questions.append(question)
+
+    return questions, new_questions, updated_questions, list(unused_questions)
+
+
+def get_answer_link_changes(questions, questions_data, existing_links, answer_ids):
+    """
+    Compare the answers of the question payloads with the existing question-answer links.
+        :param questions: The saved questions in the payload order
+        :param questions_data: List of validated question payloads
+        :param existing_links: Dictionary {question ID: {answer ID: link ID}} of the existing links
+        :param answer_ids: Dictionary {(text, is_right): answer ID} of the payload answers
+        :return: The new links and the IDs of the removed links
+    """
+    new_links = []
+    removed_link_ids = []
+
+    for question, question_data in zip(questions, questions_data, strict=True):
+        question_links = existing_links.get(question.id, {})
+        question_answer_ids = dict.fromkeys(
+            answer_ids[Answer.get_content_key(answer_data)] for answer_data in question_data['answers']
+        )
+
+        removed_link_ids.extend(link_id for answer_id, link_id in question_links.items()
+                                if answer_id not in question_answer_ids)
+        new_links.extend(QuestionAnswer(question_id=question.id, answer_id=answer_id)
+                         for answer_id in question_answer_ids if answer_id not in question_links)
+
+    return new_links, removed_link_ids
+
+
+def sync_quiz_questions(quiz, questions_data, created=False):
+    """
+    Synchronize the questions and answers of a quiz with the payload using a constant number of queries.
+    The current question/answer tree is loaded at once, the difference is computed in memory
+    and applied with bulk queries. Questions missing from the payload are deleted,
+    answers of a question are replaced with the distinct answers of its payload.
+    The caller must save the quiz afterwards to update its version.
+        :param quiz: The quiz to synchronize
+        :param questions_data: List of validated question payloads with 'answers' lists
+        :param created: True if the quiz has just been created and has no questions yet
+    """
+    existing_questions = {} if created else dict(quiz.questions.values_list('id', 'question_text'))
+    existing_links = defaultdict(dict)
+    if not created:
+        for link_id, question_id, answer_id in QuestionAnswer.objects.filter(question__quiz=quiz) \
+                .values_list('id', 'question_id', 'answer_id'):
+            existing_links[question_id][answer_id] = link_id
+
+    answer_ids = Answer.get_ids_by_content(
+        [answer_data for question_data in questions_data for answer_data in question_data['answers']]
+    )
+    questions, new_questions, updated_questions, removed_question_ids = \
+        get_question_changes(quiz, existing_questions, questions_data)
+
+    with suspend_quiz_version_signals():
+        if removed_question_ids:
+            Question.objects.filter(id__in=removed_question_ids).delete()
+        if updated_questions:
+            Question.objects.bulk_update(updated_questions, fields=('question_text', 'updated_at'))
+        if new_questions:
+            Question.objects.bulk_create(new_questions)
+
+        new_links, removed_link_ids = get_answer_link_changes(questions, questions_data, existing_links, answer_ids)
+        if removed_link_ids:
+            QuestionAnswer.objects.filter(id__in=removed_link_ids).delete()
+        if new_links:
+            QuestionAnswer.objects.bulk_create(new_links)
@@ -1,16 +1,92 @@
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
 from common.enums import QuizProgressStatus, RequestStatus
+from common.serializers import ExpandableFieldsMixin
 from company.models import Company
 from helios_backend.settings import DEFAULT_USER_AVATAR_URL, USER_AVATAR_MAX_SIZE_MB
+from services.analytics.user_analytics import preload_user_fields
 from user.models import RequestToCompany
 
 User = get_user_model()
 
 
+def get_avatar_url(user):
+    # if the image does not exist, we send the image for the user by default
+    if user.avatar and hasattr(user.avatar, 'file'):
+        return user.avatar.url
+    return DEFAULT_USER_AVATAR_URL
+
+
+def get_request_company_id(context):
+    request = context.get('request') if context else None
+    return request.query_params.get('company_id') if request else None
+
+
+class UserListSerializer(serializers.ListSerializer):
+    """
+    List serializer that preloads the method fields of all serialized users before serialization.
+    """
+    def get_users(self, instances):
+        return instances
+
+    def preload(self, instances):
+        preload_user_fields(self.get_users(instances), get_request_company_id(self.context))
+
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, 'all') else data)
+        self.preload(instances)
+        return super().to_representation(instances)
+
+
+class NestedUserListSerializer(UserListSerializer):
+    """
+    List serializer that preloads the users nested in the serialized objects, the user field
+    is named by user_field in the Meta of the child serializer. The users that are not selected with
+    the objects are loaded with one query.
+    """
+    def get_users(self, instances):
+        user_field = self.child.Meta.user_field
+        user_id_field = f'{user_field}_id'
+        field = self.child.Meta.model._meta.get_field(user_field)
+
+        users_by_id = User.objects.in_bulk({
+            getattr(instance, user_id_field) for instance in instances
+            if not field.is_cached(instance) and getattr(instance, user_id_field) is not None
+        })
+        for instance in instances:
+            if not field.is_cached(instance) and getattr(instance, user_id_field) in users_by_id:
+                setattr(instance, user_field, users_by_id[getattr(instance, user_id_field)])
+
+        if not isinstance(self.child.fields[user_field], UserSerializer):
+            # the references of the users have no method fields to preload
+            return []
+        return [getattr(instance, user_field) for instance in instances if getattr(instance, user_id_field) is not None]
+
+    def preload(self, instances):
+        super().preload(instances)
+        if isinstance(self.child, ExpandableFieldsMixin):
+            self.child.preload_expanded_fields(instances)
+
+
+class UserReferenceSerializer(serializers.ModelSerializer):
+    """
+    Reference to a user nested in other objects, the full user is serialized with ?expand=<field name>.
+    """
+    avatar = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name', 'avatar')
+
+    @staticmethod
+    def get_avatar(user):
+        return get_avatar_url(user)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer class for User objects.
@@ -33,18 +109,21 @@ class UserSerializer(serializers.ModelSerializer):
             'id', 'username', 'first_name', 'last_name', 'email', 'password', 'confirm_password', 'avatar', 'rating',
             'is_company_admin', 'is_company_member', 'is_active_invitation', 'last_company_quiz_for_user',
         ]
+        list_serializer_class = UserListSerializer
 
     @staticmethod
     def get_rating(user):
-        last_user_quiz_result = user.quiz_participant_result.filter(
-            progress_status=QuizProgressStatus.COMPLETED.value)
+        if hasattr(user, 'preloaded_rating'):
+            return user.preloaded_rating
 
-        if not last_user_quiz_result.exists():
+        try:
+            return user.quiz_stats.rating
+        except ObjectDoesNotExist:
             return None
 
-        return last_user_quiz_result.last().user_rating
-
     def get_is_company_admin(self, user):
+        if hasattr(user, 'preloaded_is_company_admin'):
+            return user.preloaded_is_company_admin
         if self.context and self.context.get('request'):
             company_id = self.context['request'].query_params.get('company_id')
             if company_id:
@@ -52,6 +131,8 @@ class UserSerializer(serializers.ModelSerializer):
         return None
 
     def get_is_company_member(self, user):
+        if hasattr(user, 'preloaded_is_company_member'):
+            return user.preloaded_is_company_member
         if self.context and self.context.get('request'):
             company_id = self.context['request'].query_params.get('company_id')
             if company_id:
@@ -59,6 +140,8 @@ class UserSerializer(serializers.ModelSerializer):
         return None
 
     def get_is_active_invitation(self, user):
+        if hasattr(user, 'preloaded_is_active_invitation'):
+            return user.preloaded_is_active_invitation
         if self.context and self.context.get('request'):
             company_id = self.context['request'].query_params.get('company_id')
             if company_id:
@@ -66,7 +149,11 @@ class UserSerializer(serializers.ModelSerializer):
         return None
 
     def get_last_company_quiz_for_user(self, user):
-        company_id = self.context['request'].query_params.get('company_id')
+        if hasattr(user, 'preloaded_last_company_quiz_for_user'):
+            return user.preloaded_last_company_quiz_for_user
+
+        # the cached quiz content renders the company owner without a request
+        company_id = get_request_company_id(self.context)
         if not company_id:
             return None
 
@@ -124,11 +211,7 @@ class UserSerializer(serializers.ModelSerializer):
         # Initialize the data dictionary with the default representation
         data = super().to_representation(instance)
 
-        if hasattr(instance, 'avatar') and instance.avatar and hasattr(instance.avatar, 'file'):
-            data['avatar'] = instance.avatar.url
-        else:
-            # if the image does not exist, we send the image for the user by default
-            data['avatar'] = DEFAULT_USER_AVATAR_URL
+        data['avatar'] = get_avatar_url(instance)
 
         return data
 
@@ -151,15 +234,18 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
 
-class RequestToCompanySerializer(serializers.ModelSerializer):
-    from company.serializers import CompanySerializer
+class RequestToCompanySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    from company.serializers import CompanyReferenceSerializer, CompanySerializer
 
-    company = CompanySerializer(read_only=True)
-    sender = UserSerializer(read_only=True)
+    company = CompanyReferenceSerializer(read_only=True)
+    sender = UserReferenceSerializer(read_only=True)
+    expanded_fields = {'company': CompanySerializer, 'sender': UserSerializer}
 
     class Meta:
         model = RequestToCompany
         fields = '__all__'
+        list_serializer_class = NestedUserListSerializer
+        user_field = 'sender'
 
     def create(self, validated_data):
         company_pk = self.context['request'].parser_context['kwargs']['pk']
@@ -1,11 +1,22 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from common.enums import RequestStatus
-from tests.test_models import CompanyFactory, RequestToCompanyFactory, UserFactory
+from tests.test_models import (
+    CompanyFactory,
+    CompanyMemberAdminFactory,
+    CompanyMemberFactory,
+    InvitationToCompanyFactory,
+    QuizFactory,
+    RequestToCompanyFactory,
+    UserFactory,
+    UserQuizResultCompletionFactory,
+)
 
 User = get_user_model()
 
@@ -180,6 +191,34 @@ class UserTests(TestCase):
         self.assertEqual(response.data['results'][0]['username'], self.user_1.username)
         self.assertEqual(response.data['results'][1]['username'], self.user_2.username)
 
+    def test_list_users_company_fields_query_count(self):
+        company = CompanyFactory(owner=self.user_1)
+        url = f'{reverse("user-list")}?company_id={company.id}'
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        queries_count = len(queries)
+
+        admin = CompanyMemberAdminFactory(company=company).member
+        member = CompanyMemberFactory(company=company).member
+        invited_user = InvitationToCompanyFactory(company=company).recipient
+        result = UserQuizResultCompletionFactory(participant=member, company=company,
+                                                 quiz=QuizFactory(company=company))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), queries_count)
+        users = {user['id']: user for user in response.data['results']}
+        self.assertTrue(users[admin.id]['is_company_admin'])
+        self.assertFalse(users[member.id]['is_company_admin'])
+        self.assertTrue(users[member.id]['is_company_member'])
+        self.assertTrue(users[invited_user.id]['is_active_invitation'])
+        self.assertFalse(users[invited_user.id]['is_company_member'])
+        self.assertEqual(users[member.id]['last_company_quiz_for_user']['quiz_title'], result.quiz.title)
+        self.assertIsNone(users[admin.id]['last_company_quiz_for_user'])
+
 
 class RequestToCompanyTests(TestCase):
     def setUp(self):
@@ -11,6 +11,7 @@ from common.enums import RequestStatus
 from common.permissions import IsCompanyOwner, IsOwner, IsRequestSender, ReadOnly
 from common.views import get_serializer_paginate
 from company.serializers import CompanySerializer, InvitationToCompanySerializer
+from services.company_fields import annotate_company_fields
 from services.decorators import log_database_changes
 
 from .models import RequestToCompany
@@ -36,28 +37,28 @@ class UserViewSet(viewsets.ModelViewSet):
     def requests(self, request, pk=None):
         if not pk or pk != request.user.id:
             raise NotFound({'message': _('Page not found.')})
-        queryset = request.user.my_requests.order_by(*self.ordering)
+        queryset = request.user.my_requests.select_related('company').order_by(*self.ordering)
         return get_serializer_paginate(self, queryset, RequestToCompanySerializer, context={'request': request})
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def invitations(self, request, pk=None):
         if not pk or pk != request.user.id:
             raise NotFound({'message': _('Page not found.')})
-        queryset = request.user.my_invitations.order_by(*self.ordering)
+        queryset = request.user.my_invitations.select_related('company').order_by(*self.ordering)
         return get_serializer_paginate(self, queryset, InvitationToCompanySerializer, context={'request': request})
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def member_companies(self, request, pk=None):
         if not pk or pk != request.user.id:
             raise NotFound({'message': _('Page not found.')})
-        queryset = request.user.my_member_companies.order_by(*self.ordering)
+        queryset = annotate_company_fields(request.user.my_member_companies, request.user).order_by(*self.ordering)
         return get_serializer_paginate(self, queryset, CompanySerializer, context={'request': request})
 
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def admin_companies(self, request, pk=None):
         if not pk or pk != request.user.id:
             raise NotFound({'message': _('Page not found.')})
-        queryset = request.user.my_admin_companies.order_by(*self.ordering)
+        queryset = annotate_company_fields(request.user.my_admin_companies, request.user).order_by(*self.ordering)
         return get_serializer_paginate(self, queryset, CompanySerializer, context={'request': request})
 
 
@@ -66,7 +67,7 @@ class RequestToCompanyViewSet(viewsets.ModelViewSet):
     ordering = ('created_at',)
 
     def get_queryset(self):
-        queryset = RequestToCompany.objects.all()
+        queryset = RequestToCompany.objects.select_related('company')
         sender_pk = self.kwargs.get('user_pk', None)
         company_pk = self.kwargs.get('company_pk', None)
 